@@ -3,7 +3,7 @@
 import asyncio
 from logging.config import fileConfig
 
-from sqlalchemy import pool
+from sqlalchemy import pool, text
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
@@ -22,6 +22,11 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 settings = get_settings()
+
+# Fail fast instead of queueing behind a long-running writer; a blocked
+# DDL statement would otherwise stall every query queued behind it.
+LOCK_TIMEOUT = "5s"
+
 config.set_main_option("sqlalchemy.url", settings.database_url_sync)
 
 
@@ -38,7 +43,17 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+        connection.commit()
+
+    # One transaction per revision so autocommit_block() (used for
+    # CREATE INDEX CONCURRENTLY) never has to break a multi-revision txn.
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
     with context.begin_transaction():
         context.run_migrations()
 
@@ -0,0 +1,50 @@
+"""places geography point + GiST index
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geography
+
+from app.db.migration_utils import drop_invalid_index
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    # Generated from latitude/longitude so existing writers keep working
+    op.add_column(
+        "places",
+        sa.Column(
+            "geom",
+            Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+            sa.Computed(
+                "ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.drop_index("ix_places_lat_lng", table_name="places")
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        drop_invalid_index("ix_places_geom", "places")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_places_geom "
+            "ON places USING GIST (geom)"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_places_geom", table_name="places")
+    op.create_index("ix_places_lat_lng", "places", ["latitude", "longitude"])
+    op.drop_column("places", "geom")
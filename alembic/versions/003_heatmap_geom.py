@@ -0,0 +1,42 @@
+"""competitor_heatmap geometry point + SP-GiST index
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+from app.db.migration_utils import drop_invalid_index
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "competitor_heatmap",
+        sa.Column(
+            "geom",
+            Geometry(geometry_type="POINT", srid=4326, spatial_index=False),
+            sa.Computed("ST_SetSRID(ST_MakePoint(grid_lng, grid_lat), 4326)", persisted=True),
+        ),
+    )
+
+    # SP-GiST suits the non-overlapping grid points better than GiST;
+    # ix_heatmap_category stays so the planner can BitmapAnd the two.
+    with op.get_context().autocommit_block():
+        drop_invalid_index("ix_heatmap_geom", "competitor_heatmap")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_heatmap_geom "
+            "ON competitor_heatmap USING SPGIST (geom)"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_heatmap_geom", table_name="competitor_heatmap")
+    op.drop_column("competitor_heatmap", "geom")
@@ -0,0 +1,52 @@
+"""composite index for filtered place listings
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_utils import drop_invalid_index
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # created_at precedes rating so `ORDER BY created_at DESC LIMIT n`
+        # is read straight off the index; rating is filtered in-index.
+        drop_invalid_index("ix_places_class_created_rating", "places")
+        op.create_index(
+            "ix_places_class_created_rating",
+            "places",
+            ["classification", sa.text("created_at DESC"), "rating"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Redundant: classification is the new index's leading column
+        op.drop_index(
+            "ix_places_classification",
+            table_name="places",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_places_classification",
+            "places",
+            ["classification"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_places_class_created_rating",
+            table_name="places",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,42 @@
+"""trigram index for substring search on places.search_query
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+
+from app.db.migration_utils import drop_invalid_index
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Lets `search_query ILIKE '%term%'` (heatmap category, /places and
+    # /export filters) use an index instead of scanning every place
+    with op.get_context().autocommit_block():
+        drop_invalid_index("ix_places_search_query_trgm", "places")
+        op.create_index(
+            "ix_places_search_query_trgm",
+            "places",
+            ["search_query"],
+            postgresql_using="gin",
+            postgresql_ops={"search_query": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_places_search_query_trgm",
+            table_name="places",
+            postgresql_concurrently=True,
+        )
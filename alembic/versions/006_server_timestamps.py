@@ -0,0 +1,36 @@
+"""database-side defaults for created/updated/computed timestamps
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns are timestamp without time zone holding UTC
+UTC_NOW = sa.text("timezone('utc', now())")
+
+TIMESTAMP_COLUMNS = [
+    ("places", "created_at"),
+    ("places", "updated_at"),
+    ("place_emails", "created_at"),
+    ("place_enrichments", "created_at"),
+    ("competitor_heatmap", "computed_at"),
+    ("location_scores", "computed_at"),
+]
+
+
+def upgrade() -> None:
+    for table_name, column_name in TIMESTAMP_COLUMNS:
+        op.alter_column(table_name, column_name, server_default=UTC_NOW)
+
+
+def downgrade() -> None:
+    for table_name, column_name in TIMESTAMP_COLUMNS:
+        op.alter_column(table_name, column_name, server_default=None)
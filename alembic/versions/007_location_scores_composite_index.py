@@ -0,0 +1,40 @@
+"""descending composite_score index for top-location queries
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_utils import drop_invalid_index
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # `ORDER BY composite_score DESC LIMIT n` walks the index instead of
+    # sorting every score; the search_query trigram index is revision 005
+    with op.get_context().autocommit_block():
+        drop_invalid_index("ix_location_scores_composite_desc", "location_scores")
+        op.create_index(
+            "ix_location_scores_composite_desc",
+            "location_scores",
+            [sa.text("composite_score DESC")],
+            postgresql_include=["place_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_location_scores_composite_desc",
+            table_name="location_scores",
+            postgresql_concurrently=True,
+        )
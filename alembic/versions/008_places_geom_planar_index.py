@@ -0,0 +1,41 @@
+"""planar GiST index on places.geom for lng/lat box filters
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-15
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_utils import drop_invalid_index
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The heatmap filters on a plain lng/lat rectangle. A geography box has
+    # geodesic edges (and wraps at the antimeridian), so that filter runs on
+    # geometry(geom), which ix_places_geom (geography) cannot serve
+    with op.get_context().autocommit_block():
+        drop_invalid_index("ix_places_geom_planar", "places")
+        op.create_index(
+            "ix_places_geom_planar",
+            "places",
+            [sa.text("geometry(geom)")],
+            postgresql_using="gist",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_places_geom_planar",
+            table_name="places",
+            postgresql_concurrently=True,
+        )
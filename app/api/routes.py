@@ -5,19 +5,20 @@ plus classification, scoring, and CSV export endpoints.
 
 from __future__ import annotations
 
-import io
-import csv
-import json
 import uuid
 import asyncio
+import contextlib
 import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Query, Request
-from fastapi.responses import StreamingResponse
+import orjson
+from pydantic import TypeAdapter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, case, literal, bindparam
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import joinedload, contains_eager
 
 from app.db.session import get_db
 from app.db.models import Place, PlaceEmail, PlaceEnrichment
@@ -26,8 +27,7 @@ from app.schemas import (
     SearchResponse,
     PlaceOut,
     HeatmapRequest,
-    HeatmapResponse,
-    HeatmapCell,
+    HeatmapResponseColumnar,
     ScoreRequest,
     LocationScoreResponse,
     LocationScoreOut,
@@ -37,11 +37,16 @@ from app.services.enrichment import WebsiteEnricher
 from app.services.classifier import BusinessClassifier
 from app.services.heatmap import HeatmapEngine
 from app.services.scoring import ScoringEngine
+from app.services.enrichment_queue import EnrichmentQueue
+from app.config import get_settings
 from app.logging_config import logger
 
+settings = get_settings()
 router = APIRouter()
 
 # ── Singleton service instances ──────────────────────────────────
+# Process-lifetime: their HTTP connection pools are reused across requests
+# and only closed by close_clients() at app shutdown.
 _places_client = GooglePlacesClient()
 _enricher = WebsiteEnricher()
 _classifier = BusinessClassifier()
@@ -49,6 +54,54 @@ _heatmap = HeatmapEngine()
 _scoring = ScoringEngine()
 
 
+async def close_clients():
+    """Close the shared outbound HTTP clients (called from app shutdown)."""
+    await _places_client.close()
+    await _enricher.close()
+
+
+# ── Shared loaders ───────────────────────────────────────────────
+
+# Built once at import; executions only bind parameters. Emails and
+# enrichment come back in the same LEFT JOIN round-trip.
+_PLACE_BY_IDS_STMT = (
+    select(Place)
+    .where(Place.id.in_(bindparam("ids", expanding=True)))
+    .options(joinedload(Place.emails), joinedload(Place.enrichment))
+)
+_PLACE_BY_ID_STMT = (
+    select(Place)
+    .where(Place.id == bindparam("place_id"))
+    .options(joinedload(Place.emails), joinedload(Place.enrichment))
+)
+
+
+async def _load_places_with_relations(db: AsyncSession, ids: list[int]) -> list[Place]:
+    """Load places with emails + enrichment in a single LEFT JOIN round-trip."""
+    result = await db.execute(_PLACE_BY_IDS_STMT, {"ids": ids})
+    return list(result.unique().scalars().all())
+
+
+# ── JSON responses ───────────────────────────────────────────────
+
+_PLACE_LIST = TypeAdapter(list[PlaceOut])
+
+
+def _json_response(body: bytes | str) -> Response:
+    """
+    Already-serialised JSON (pydantic-core). Returning a Response skips
+    FastAPI's response_model pass, which would dump and re-validate every
+    place a second time; response_model stays on the routes for the docs.
+    """
+    return Response(body, media_type="application/json")
+
+
+def _sse_event(event: str, data: dict) -> bytes:
+    """Encode one Server-Sent Event; orjson handles datetimes natively."""
+    payload = orjson.dumps(data, default=str)
+    return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+
+
 # ── Background enrichment task ───────────────────────────────────
 
 async def _background_enrich_and_score(place_ids: list[int]):
@@ -57,13 +110,7 @@ async def _background_enrich_and_score(place_ids: list[int]):
 
     async with async_session_factory() as db:
         try:
-            stmt = (
-                select(Place)
-                .where(Place.id.in_(place_ids))
-                .options(selectinload(Place.emails), selectinload(Place.enrichment))
-            )
-            result = await db.execute(stmt)
-            places = list(result.scalars().all())
+            places = await _load_places_with_relations(db, place_ids)
 
             # Stage 2: Enrichment
             logger.info(f"Background: enriching {len(places)} places")
@@ -80,8 +127,13 @@ async def _background_enrich_and_score(place_ids: list[int]):
             logger.info(f"Background enrichment complete for {len(places)} places")
         except Exception as exc:
             logger.error(f"Background enrichment failed: {exc}")
-        finally:
-            await _enricher.close()
+
+
+enrichment_queue = EnrichmentQueue(
+    _background_enrich_and_score,
+    workers=settings.enrichment_workers,
+    batch_window=settings.enrichment_batch_window,
+)
 
 
 # ── Search endpoint ──────────────────────────────────────────────
@@ -89,7 +141,6 @@ async def _background_enrich_and_score(place_ids: list[int]):
 @router.post("/search", response_model=SearchResponse)
 async def search_places(
     request: SearchRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -101,26 +152,14 @@ async def search_places(
 
     try:
         # Stage 1: Geo ingestion — use grid search for wider coverage
-        if request.location and request.radius_km:
-            try:
-                parts = request.location.split(",")
-                clat = float(parts[0].strip())
-                clng = float(parts[1].strip())
-                raw_results = await _places_client.grid_search(
-                    query=request.query,
-                    center_lat=clat,
-                    center_lng=clng,
-                    radius_km=request.radius_km,
-                    max_pages=request.max_pages,
-                )
-            except (ValueError, IndexError):
-                # fallback to simple search if location parse fails
-                raw_results = await _places_client.text_search(
-                    query=request.query,
-                    location=request.location,
-                    radius=int(request.radius_km * 1000) if request.radius_km else None,
-                    max_pages=request.max_pages,
-                )
+        if request.center_lat is not None and request.radius_km:
+            raw_results = await _places_client.grid_search(
+                query=request.query,
+                center_lat=request.center_lat,
+                center_lng=request.center_lng,
+                radius_km=request.radius_km,
+                max_pages=request.max_pages,
+            )
         else:
             raw_results = await _places_client.text_search(
                 query=request.query,
@@ -150,33 +189,25 @@ async def search_places(
         # Trigger background enrichment if requested
         if request.enrich:
             place_ids = [p.id for p in places]
-            background_tasks.add_task(_background_enrich_and_score, place_ids)
+            enrichment_queue.submit(place_ids)
 
         # Re-fetch with relationships for response
-        stmt = (
-            select(Place)
-            .where(Place.id.in_([p.id for p in places]))
-            .options(selectinload(Place.emails), selectinload(Place.enrichment))
-        )
-        result = await db.execute(stmt)
-        places = list(result.scalars().all())
+        places = await _load_places_with_relations(db, [p.id for p in places])
 
-        return SearchResponse(
+        return _json_response(SearchResponse(
             query=request.query,
             location=request.location,
             total_results=len(places),
-            places=[PlaceOut.model_validate(p) for p in places],
+            places=[PlaceOut.from_orm_trusted(p) for p in places],
             task_id=task_id,
             message="Search completed. Enrichment running in background."
             if request.enrich
             else "Search completed.",
-        )
+        ).model_dump_json())
 
     except Exception as exc:
         logger.error(f"Search failed: {exc}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(exc)}")
-    finally:
-        await _places_client.close()
 
 
 # ── SSE Search endpoint (streams progress) ──────────────────────
@@ -203,40 +234,42 @@ async def search_places_stream(
                     "unique": unique_so_far,
                 })
 
-            # Parse location
-            use_grid = False
-            if request.location and request.radius_km:
-                try:
-                    parts = request.location.split(",")
-                    clat = float(parts[0].strip())
-                    clng = float(parts[1].strip())
-                    use_grid = True
-                except (ValueError, IndexError):
-                    use_grid = False
-
-            if use_grid:
+            if request.center_lat is not None and request.radius_km:
                 # Launch grid search in a task so we can drain progress
                 search_task = asyncio.create_task(
                     _places_client.grid_search(
                         query=request.query,
-                        center_lat=clat,
-                        center_lng=clng,
+                        center_lat=request.center_lat,
+                        center_lng=request.center_lng,
                         radius_km=request.radius_km,
                         max_pages=request.max_pages,
                         on_progress=on_progress,
                     )
                 )
-                # Drain progress events while search runs
-                while not search_task.done():
-                    try:
-                        prog = await asyncio.wait_for(progress_queue.get(), timeout=0.5)
-                        yield f"event: progress\ndata: {json.dumps(prog)}\n\n"
-                    except asyncio.TimeoutError:
-                        pass
+                # Forward progress events as soon as they are queued
+                next_progress = asyncio.create_task(progress_queue.get())
+                try:
+                    while not search_task.done():
+                        done, _ = await asyncio.wait(
+                            {search_task, next_progress},
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                        if next_progress in done:
+                            yield _sse_event("progress", next_progress.result())
+                            next_progress = asyncio.create_task(progress_queue.get())
+                finally:
+                    if not next_progress.done():
+                        next_progress.cancel()
+                if next_progress.done():
+                    yield _sse_event("progress", next_progress.result())
+
                 # Drain any remaining progress events
-                while not progress_queue.empty():
-                    prog = await progress_queue.get()
-                    yield f"event: progress\ndata: {json.dumps(prog)}\n\n"
+                while True:
+                    try:
+                        prog = progress_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    yield _sse_event("progress", prog)
 
                 raw_results = search_task.result()
             else:
@@ -256,7 +289,7 @@ async def search_places_stream(
                     "task_id": task_id,
                     "message": "No results found",
                 }
-                yield f"event: result\ndata: {json.dumps(data)}\n\n"
+                yield _sse_event("result", data)
                 return
 
             # Persist
@@ -270,34 +303,29 @@ async def search_places_stream(
             # Trigger background enrichment
             if request.enrich:
                 place_ids = [p.id for p in places]
-                asyncio.create_task(_background_enrich_and_score(place_ids))
+                enrichment_queue.submit(place_ids)
 
             # Re-fetch with relationships
-            stmt = (
-                select(Place)
-                .where(Place.id.in_([p.id for p in places]))
-                .options(selectinload(Place.emails), selectinload(Place.enrichment))
-            )
-            result = await db.execute(stmt)
-            places = list(result.scalars().all())
+            places = await _load_places_with_relations(db, [p.id for p in places])
 
             data = {
                 "query": request.query,
                 "location": request.location,
                 "total_results": len(places),
-                "places": [PlaceOut.model_validate(p).model_dump(mode="json") for p in places],
+                # Same PlaceOut JSON as /search (pydantic-core), as a dict for _sse_event
+                "places": _PLACE_LIST.dump_python(
+                    [PlaceOut.from_orm_trusted(p) for p in places], mode="json"
+                ),
                 "task_id": task_id,
                 "message": "Search completed. Enrichment running in background."
                 if request.enrich
                 else "Search completed.",
             }
-            yield f"event: result\ndata: {json.dumps(data, default=str)}\n\n"
+            yield _sse_event("result", data)
 
         except Exception as exc:
             logger.error(f"SSE search failed: {exc}")
-            yield f"event: error\ndata: {json.dumps({'detail': str(exc)})}\n\n"
-        finally:
-            await _places_client.close()
+            yield _sse_event("error", {"detail": str(exc)})
 
     return StreamingResponse(
         event_generator(),
@@ -315,16 +343,11 @@ async def search_places_stream(
 @router.get("/places/{place_db_id}", response_model=PlaceOut)
 async def get_place(place_db_id: int, db: AsyncSession = Depends(get_db)):
     """Retrieve a single place with its enrichment data."""
-    stmt = (
-        select(Place)
-        .where(Place.id == place_db_id)
-        .options(selectinload(Place.emails), selectinload(Place.enrichment))
-    )
-    result = await db.execute(stmt)
-    place = result.scalar_one_or_none()
+    result = await db.execute(_PLACE_BY_ID_STMT, {"place_id": place_db_id})
+    place = result.unique().scalar_one_or_none()
     if not place:
         raise HTTPException(status_code=404, detail="Place not found")
-    return PlaceOut.model_validate(place)
+    return _json_response(PlaceOut.from_orm_trusted(place).model_dump_json())
 
 
 # ── List places ──────────────────────────────────────────────────
@@ -339,32 +362,34 @@ async def list_places(
     db: AsyncSession = Depends(get_db),
 ):
     """List stored places with optional filters."""
+    # Page over place ids first so LIMIT counts places, not joined email rows
+    page = _filter_places(select(Place.id), query, classification, min_rating)
+    page = page.order_by(Place.created_at.desc()).offset(offset).limit(limit).subquery()
+
     stmt = (
         select(Place)
-        .options(selectinload(Place.emails), selectinload(Place.enrichment))
+        .join(page, Place.id == page.c.id)
+        .outerjoin(Place.emails)
+        .outerjoin(Place.enrichment)
+        .options(contains_eager(Place.emails), contains_eager(Place.enrichment))
+        .order_by(Place.created_at.desc(), Place.id, PlaceEmail.id)
     )
-    if query:
-        stmt = stmt.where(Place.search_query.ilike(f"%{query}%"))
-    if classification:
-        stmt = stmt.where(Place.classification == classification)
-    if min_rating:
-        stmt = stmt.where(Place.rating >= min_rating)
-
-    stmt = stmt.order_by(Place.created_at.desc()).offset(offset).limit(limit)
     result = await db.execute(stmt)
-    places = result.scalars().all()
-    return [PlaceOut.model_validate(p) for p in places]
+    places = result.unique().scalars().all()
+    return _json_response(
+        _PLACE_LIST.dump_json([PlaceOut.from_orm_trusted(p) for p in places])
+    )
 
 
 # ── Heatmap endpoint ────────────────────────────────────────────
 
-@router.post("/heatmap", response_model=HeatmapResponse)
+@router.post("/heatmap", response_model=HeatmapResponseColumnar)
 async def compute_heatmap(
     request: HeatmapRequest,
     db: AsyncSession = Depends(get_db),
 ):
     """Compute competitor density heatmap for a category in a bounding box."""
-    cells = await _heatmap.compute_heatmap(
+    grid = await _heatmap.compute_heatmap(
         db,
         category=request.category,
         lat_min=request.lat_min,
@@ -373,10 +398,19 @@ async def compute_heatmap(
         lng_max=request.lng_max,
         grid_size=request.grid_size,
     )
-    return HeatmapResponse(
-        category=request.category,
-        total_cells=len(cells),
-        cells=[HeatmapCell.model_validate(c) for c in cells],
+    # Serialised column-by-column straight from the NumPy arrays (NaN -> null)
+    payload = {
+        "category": request.category,
+        "total_cells": len(grid),
+        "grid_lat": grid.grid_lat,
+        "grid_lng": grid.grid_lng,
+        "place_count": grid.place_count,
+        "avg_rating": grid.avg_rating,
+        "avg_price_level": grid.avg_price_level,
+    }
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json",
     )
 
 
@@ -442,70 +476,124 @@ async def competitor_density(
 
 # ── CSV Export endpoint ──────────────────────────────────────────
 
+def _filter_places(stmt, query: Optional[str], classification: Optional[str], min_rating: Optional[float]):
+    """Apply the shared /places and /export filters to a Place select."""
+    if query:
+        stmt = stmt.where(Place.search_query.ilike(f"%{query}%"))
+    if classification:
+        stmt = stmt.where(Place.classification == classification)
+    if min_rating:
+        stmt = stmt.where(Place.rating >= min_rating)
+    return stmt
+
+
+def _csv_export_columns() -> tuple:
+    """Labelled export columns; labels become the CSV header."""
+    place_types = func.json_array_elements_text(Place.types).table_valued("value")
+    types_joined = (
+        select(func.string_agg(place_types.c.value, literal(", ")))
+        .select_from(place_types)
+        .scalar_subquery()
+    )
+    emails_joined = (
+        select(func.string_agg(PlaceEmail.email, aggregate_order_by(literal("; "), PlaceEmail.id)))
+        .where(PlaceEmail.place_id == Place.id)
+        .scalar_subquery()
+    )
+    iso_format = 'YYYY-MM-DD"T"HH24:MI:SS.US'
+
+    return (
+        Place.name.label("Name"),
+        Place.place_id.label("Place ID"),
+        case((func.json_typeof(Place.types) == "array", types_joined)).label("Type"),
+        Place.formatted_address.label("Address"),
+        Place.latitude.label("Latitude"),
+        Place.longitude.label("Longitude"),
+        Place.rating.label("Rating"),
+        Place.user_ratings_total.label("Reviews"),
+        Place.formatted_phone_number.label("Phone"),
+        Place.website.label("Website"),
+        Place.business_status.label("Business Status"),
+        Place.price_level.label("Price Level"),
+        Place.classification.label("Classification"),
+        func.round(Place.classification_confidence * 100).label("Confidence %"),
+        func.round(Place.location_score * 100).label("Location Score %"),
+        emails_joined.label("Emails"),
+        func.to_char(Place.enriched_at, iso_format).label("Enriched At"),
+        func.to_char(Place.created_at, iso_format).label("Created At"),
+    )
+
+
+# Built once per process; every export request reuses the same expressions
+CSV_COLUMNS = _csv_export_columns()
+CSV_HEADERS = tuple(col.name for col in CSV_COLUMNS)
+
+
+def _csv_export_query(query: Optional[str], classification: Optional[str], min_rating: Optional[float], limit: int):
+    """Filtered, newest-first export select over CSV_COLUMNS."""
+    stmt = _filter_places(select(*CSV_COLUMNS), query, classification, min_rating)
+    return stmt.order_by(Place.created_at.desc()).limit(limit)
+
+
+def _compile_for_copy(stmt) -> tuple[str, list]:
+    """Render a Core select as asyncpg SQL with positional ($n) arguments."""
+    from app.db.session import engine
+
+    compiled = stmt.compile(dialect=engine.dialect)
+    return str(compiled), [compiled.params[name] for name in compiled.positiontup]
+
+
+async def _stream_copy_csv(sql: str, args: list):
+    """Yield CSV chunks from `COPY (sql) TO STDOUT` as PostgreSQL sends them."""
+    from app.db.session import engine
+
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=16)
+
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+
+        async def copy_out():
+            try:
+                await raw.driver_connection.copy_from_query(
+                    sql, *args, output=chunks.put, format="csv", header=True
+                )
+            finally:
+                await chunks.put(None)
+
+        copy_task = asyncio.create_task(copy_out())
+        try:
+            # UTF-8 BOM so Excel opens Arabic/Unicode correctly
+            yield b"\xef\xbb\xbf"
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+            await copy_task  # surface COPY errors
+        finally:
+            # Client went away mid-export: stop the COPY and wait for it here,
+            # so the connection is idle again before it returns to the pool
+            if not copy_task.done():
+                copy_task.cancel()
+                # Make room for its end marker, or its `finally` blocks forever
+                while not chunks.empty():
+                    chunks.get_nowait()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await copy_task
+
+
 @router.get("/export/csv")
 async def export_csv(
     query: Optional[str] = Query(None, description="Filter by search query"),
     classification: Optional[str] = Query(None),
     min_rating: Optional[float] = Query(None, ge=1, le=5),
     limit: int = Query(500, ge=1, le=2000),
-    db: AsyncSession = Depends(get_db),
 ):
     """Export places data as a downloadable CSV file."""
-    stmt = (
-        select(Place)
-        .options(selectinload(Place.emails), selectinload(Place.enrichment))
+    sql, args = _compile_for_copy(
+        _csv_export_query(query, classification, min_rating, limit)
     )
-    if query:
-        stmt = stmt.where(Place.search_query.ilike(f"%{query}%"))
-    if classification:
-        stmt = stmt.where(Place.classification == classification)
-    if min_rating:
-        stmt = stmt.where(Place.rating >= min_rating)
-
-    stmt = stmt.order_by(Place.created_at.desc()).limit(limit)
-    result = await db.execute(stmt)
-    places = list(result.scalars().all())
 
-    # Build CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "Name", "Place ID", "Type", "Address",
-        "Latitude", "Longitude", "Rating", "Reviews",
-        "Phone", "Website", "Business Status", "Price Level",
-        "Classification", "Confidence %", "Location Score %",
-        "Emails", "Enriched At", "Created At",
-    ])
-
-    for p in places:
-        emails_str = "; ".join(e.email for e in p.emails) if p.emails else ""
-        writer.writerow([
-            p.name,
-            p.place_id,
-            ", ".join(p.types) if p.types else "",
-            p.formatted_address or "",
-            p.latitude or "",
-            p.longitude or "",
-            p.rating or "",
-            p.user_ratings_total or "",
-            p.formatted_phone_number or "",
-            p.website or "",
-            p.business_status or "",
-            p.price_level if p.price_level is not None else "",
-            p.classification or "",
-            f"{p.classification_confidence * 100:.0f}" if p.classification_confidence else "",
-            f"{p.location_score * 100:.0f}" if p.location_score else "",
-            emails_str,
-            p.enriched_at.isoformat() if p.enriched_at else "",
-            p.created_at.isoformat() if p.created_at else "",
-        ])
-
-    # Encode with UTF-8 BOM so Excel opens Arabic/Unicode correctly
-    csv_bytes = b"\xef\xbb\xbf" + output.getvalue().encode("utf-8")
-    output.seek(0)
     filename = f"places_export_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
     return StreamingResponse(
-        iter([csv_bytes]),
+        _stream_copy_csv(sql, args),
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
@@ -15,12 +15,16 @@ class Settings(BaseSettings):
 
     # Rate Limiting
     max_requests_per_second: int = 5
+    max_requests_per_minute: int = 600
     pagination_delay_seconds: float = 2.0
 
     # Enrichment
     enrichment_timeout: int = 10
     enrichment_max_retries: int = 3
     respect_robots_txt: bool = True
+    enrichment_concurrency: int = 16
+    enrichment_workers: int = 2
+    enrichment_batch_window: float = 0.1
 
     # Server
     host: str = "0.0.0.0"
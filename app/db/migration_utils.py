@@ -0,0 +1,24 @@
+"""Helpers shared by the Alembic revisions."""
+
+from alembic import op
+import sqlalchemy as sa
+
+_INDEX_IS_INVALID = sa.text(
+    "SELECT NOT i.indisvalid FROM pg_index i "
+    "JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+)
+
+
+def drop_invalid_index(name: str, table_name: str) -> None:
+    """
+    Drop an INVALID leftover of an earlier CREATE INDEX CONCURRENTLY.
+
+    A concurrent build that fails (e.g. on lock_timeout) leaves the index
+    behind marked invalid; `IF NOT EXISTS` would then keep the broken index
+    and report success. Call inside the autocommit_block, before the build.
+    """
+    if op.get_context().as_sql:
+        return  # offline SQL generation: no catalog to inspect
+    if op.get_bind().execute(_INDEX_IS_INVALID, {"name": name}).scalar():
+        op.drop_index(name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
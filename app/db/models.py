@@ -1,6 +1,5 @@
 """SQLAlchemy ORM models for the Places data pipeline."""
 
-import datetime
 from sqlalchemy import (
     Column,
     String,
@@ -13,11 +12,20 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
     Index,
+    Computed,
+    text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql import func
+from geoalchemy2 import Geography, Geometry
 from app.db.session import Base
 
 
+def utc_now():
+    """Naive-UTC 'now' evaluated by PostgreSQL (columns are timestamp without time zone)."""
+    return func.timezone("utc", func.now())
+
+
 class Place(Base):
     __tablename__ = "places"
 
@@ -27,6 +35,17 @@ class Place(Base):
     formatted_address = Column(Text, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    # PostGIS point derived from latitude/longitude (GiST-indexed for radius queries)
+    geom = deferred(
+        Column(
+            Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+            Computed(
+                "ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography",
+                persisted=True,
+            ),
+            nullable=True,
+        )
+    )
     rating = Column(Float, nullable=True)
     user_ratings_total = Column(Integer, nullable=True)
     formatted_phone_number = Column(String(50), nullable=True)
@@ -50,12 +69,8 @@ class Place(Base):
     search_location = Column(String(255), nullable=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(
-        DateTime,
-        default=datetime.datetime.utcnow,
-        onupdate=datetime.datetime.utcnow,
-    )
+    created_at = Column(DateTime, server_default=utc_now())
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
     enriched_at = Column(DateTime, nullable=True)
 
     # Relationships
@@ -64,10 +79,29 @@ class Place(Base):
         "PlaceEnrichment", back_populates="place", uselist=False, cascade="all, delete-orphan"
     )
 
+    # Fetch DB-generated timestamps via RETURNING on UPDATE too, so they are
+    # never lazy-loaded (not possible under AsyncSession)
+    __mapper_args__ = {"eager_defaults": True}
+
     __table_args__ = (
-        Index("ix_places_lat_lng", "latitude", "longitude"),
-        Index("ix_places_classification", "classification"),
+        Index("ix_places_geom", "geom", postgresql_using="gist"),
+        # Planar box filters (heatmap bbox): `geometry(geom) && ST_MakeEnvelope(...)`
+        Index("ix_places_geom_planar", text("geometry(geom)"), postgresql_using="gist"),
+        # Serves `classification = ? [AND rating >= ?] ORDER BY created_at DESC LIMIT n`
+        Index(
+            "ix_places_class_created_rating",
+            "classification",
+            text("created_at DESC"),
+            "rating",
+        ),
         Index("ix_places_search", "search_query", "search_location"),
+        # Trigram GIN: serves `search_query ILIKE '%term%'` (needs pg_trgm)
+        Index(
+            "ix_places_search_query_trgm",
+            "search_query",
+            postgresql_using="gin",
+            postgresql_ops={"search_query": "gin_trgm_ops"},
+        ),
     )
 
 
@@ -78,7 +112,7 @@ class PlaceEmail(Base):
     place_id = Column(Integer, ForeignKey("places.id", ondelete="CASCADE"), nullable=False)
     email = Column(String(320), nullable=False)
     source = Column(String(50), nullable=True)  # 'homepage', 'contact_page'
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
 
     place = relationship("Place", back_populates="emails")
 
@@ -97,7 +131,7 @@ class PlaceEnrichment(Base):
     contact_page_url = Column(Text, nullable=True)
     robots_txt_allows = Column(Boolean, nullable=True)
     enrichment_error = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
 
     place = relationship("Place", back_populates="enrichment")
 
@@ -113,11 +147,19 @@ class CompetitorHeatmap(Base):
     place_count = Column(Integer, default=0)
     avg_rating = Column(Float, nullable=True)
     avg_price_level = Column(Float, nullable=True)
-    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    computed_at = Column(DateTime, server_default=utc_now())
+    # Cell SW corner as a planar point (SP-GiST-indexed for bbox lookups)
+    geom = deferred(
+        Column(
+            Geometry(geometry_type="POINT", srid=4326, spatial_index=False),
+            Computed("ST_SetSRID(ST_MakePoint(grid_lng, grid_lat), 4326)", persisted=True),
+        )
+    )
 
     __table_args__ = (
         UniqueConstraint("grid_lat", "grid_lng", "category", name="uq_heatmap_cell"),
         Index("ix_heatmap_category", "category"),
+        Index("ix_heatmap_geom", "geom", postgresql_using="spgist"),
     )
 
 
@@ -132,4 +174,14 @@ class LocationScore(Base):
     accessibility_score = Column(Float, default=0.0)
     rating_score = Column(Float, default=0.0)
     composite_score = Column(Float, default=0.0)
-    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    computed_at = Column(DateTime, server_default=utc_now())
+
+    __table_args__ = (
+        # Top-K by score (get_top_locations) read off the index; place_id is
+        # included so the join to places needs no heap visit
+        Index(
+            "ix_location_scores_composite_desc",
+            text("composite_score DESC"),
+            postgresql_include=["place_id"],
+        ),
+    )
@@ -1,17 +1,31 @@
 """Async database session management."""
 
+from sqlalchemy import text, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
 
 settings = get_settings()
 
+_url = make_url(settings.database_url)
+
+_engine_kwargs: dict = {}
+if _url.get_backend_name() == "postgresql":
+    _engine_kwargs.update(pool_size=20, max_overflow=10)
+if _url.get_driver_name() == "asyncpg":
+    # The listing / search / export queries repeat with only their parameters
+    # changing: keep them prepared server-side instead of re-parsing each time.
+    _engine_kwargs["connect_args"] = {
+        "prepared_statement_cache_size": 1024,  # SQLAlchemy adapter cache
+        "statement_cache_size": 1024,           # asyncpg connection cache
+    }
+
 engine = create_async_engine(
-    settings.database_url,
+    _url,
     echo=settings.debug,
-    pool_size=20,
-    max_overflow=10,
     pool_pre_ping=True,
+    query_cache_size=1200,  # compiled-SQL cache shared by all connections
+    **_engine_kwargs,
 )
 
 async_session_factory = async_sessionmaker(
@@ -37,4 +51,6 @@ async def get_db() -> AsyncSession:
 
 async def init_db():
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
@@ -3,16 +3,18 @@ FastAPI application factory with lifespan management.
 """
 
 import os
+import time
 from pathlib import Path
 from contextlib import asynccontextmanager
+from functools import lru_cache
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
 from app.db.session import init_db, engine
-from app.api.routes import router as api_router
+from app.api.routes import router as api_router, close_clients, enrichment_queue
 from app.schemas import HealthResponse
 from app.logging_config import logger
 
@@ -25,7 +27,10 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Places Ingestion Service")
     await init_db()
     logger.info("Database tables ensured")
+    enrichment_queue.start()
     yield
+    await enrichment_queue.stop()
+    await close_clients()
     await engine.dispose()
     logger.info("Service shut down")
 
@@ -38,6 +43,7 @@ app = FastAPI(
     ),
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -57,16 +63,27 @@ if STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
+# Last successful DB probe (monotonic time); load-balancer probes within the
+# TTL reuse it instead of checking out a pooled connection each time
+HEALTH_TTL_SECONDS = 2.0
+_last_db_ok = float("-inf")
+
+
 @app.get("/health", response_model=HealthResponse, tags=["System"])
 async def health_check():
     """Health check endpoint."""
-    try:
-        from sqlalchemy import text
-        async with engine.connect() as conn:
-            await conn.execute(text("SELECT 1"))
+    global _last_db_ok
+    if time.monotonic() - _last_db_ok < HEALTH_TTL_SECONDS:
         db_status = "connected"
-    except Exception:
-        db_status = "disconnected"
+    else:
+        try:
+            from sqlalchemy import text
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            db_status = "connected"
+            _last_db_ok = time.monotonic()
+        except Exception:
+            db_status = "disconnected"
 
     return HealthResponse(
         status="healthy",
@@ -75,12 +92,18 @@ async def health_check():
     )
 
 
+@lru_cache(maxsize=8)
+def _read_static(path: Path, mtime_ns: int) -> bytes:
+    """File contents, cached in memory until the file's mtime changes."""
+    return path.read_bytes()
+
+
 @app.get("/", tags=["System"])
 async def root():
     """Serve the frontend dashboard."""
     index_path = STATIC_DIR / "index.html"
     if index_path.exists():
-        return FileResponse(str(index_path))
+        return HTMLResponse(_read_static(index_path, index_path.stat().st_mtime_ns))
     return {
         "service": "Google Places Data Ingestion & Enrichment",
         "version": "1.0.0",
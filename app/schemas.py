@@ -1,9 +1,15 @@
 """Pydantic schemas for request/response validation."""
 
 from __future__ import annotations
+import re
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+# "lat,lng" coordinate pair accepted by SearchRequest.location
+_LAT_LNG_RE = re.compile(
+    r"^\s*([+-]?(?:\d+\.?\d*|\.\d+))\s*,\s*([+-]?(?:\d+\.?\d*|\.\d+))\s*$"
+)
 
 
 # ── Request schemas ──────────────────────────────────────────────
@@ -15,6 +21,25 @@ class SearchRequest(BaseModel):
     max_pages: int = Field(3, ge=1, le=10, description="Max pagination pages per sub-region (each page ≤ 20 results)")
     enrich: bool = Field(True, description="Whether to enrich with website/email data")
 
+    _center: Optional[tuple[float, float]] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def _parse_center(self) -> SearchRequest:
+        """Parse `location` once into a (lat, lng) center if it is a coordinate pair."""
+        if self.location:
+            match = _LAT_LNG_RE.match(self.location)
+            if match:
+                self._center = (float(match.group(1)), float(match.group(2)))
+        return self
+
+    @property
+    def center_lat(self) -> Optional[float]:
+        return self._center[0] if self._center else None
+
+    @property
+    def center_lng(self) -> Optional[float]:
+        return self._center[1] if self._center else None
+
 
 class HeatmapRequest(BaseModel):
     category: str = Field(..., description="Place category/type to analyze")
@@ -24,6 +49,13 @@ class HeatmapRequest(BaseModel):
     lng_max: float = Field(..., ge=-180, le=180)
     grid_size: float = Field(0.01, gt=0, le=1, description="Grid cell size in degrees")
 
+    @model_validator(mode="after")
+    def _check_bounds(self) -> HeatmapRequest:
+        """Reject inverted boxes (422); equal bounds are a valid, empty grid."""
+        if self.lat_min > self.lat_max or self.lng_min > self.lng_max:
+            raise ValueError("lat_min/lng_min must not exceed lat_max/lng_max")
+        return self
+
 
 class ScoreRequest(BaseModel):
     place_ids: list[int] = Field(..., min_length=1, description="DB IDs of places to score")
@@ -75,6 +107,33 @@ class PlaceOut(BaseModel):
 
     model_config = {"from_attributes": True}
 
+    @classmethod
+    def from_orm_trusted(cls, obj) -> PlaceOut:
+        """
+        Build from a DB-loaded Place without validation.
+
+        Values coming back from SQLAlchemy already match the column types
+        the schema declares, so model_construct skips the coercion pass.
+        Inbound request models keep full validation.
+        """
+        data = {f: getattr(obj, f) for f in _PLACE_SCALAR_FIELDS}
+        data["emails"] = [
+            EmailOut.model_construct(email=e.email, source=e.source) for e in obj.emails
+        ]
+        data["enrichment"] = (
+            EnrichmentOut.model_construct(
+                **{f: getattr(obj.enrichment, f) for f in EnrichmentOut.model_fields}
+            )
+            if obj.enrichment is not None
+            else None
+        )
+        return cls.model_construct(**data)
+
+
+_PLACE_SCALAR_FIELDS = tuple(
+    f for f in PlaceOut.model_fields if f not in ("emails", "enrichment")
+)
+
 
 class SearchResponse(BaseModel):
     query: str
@@ -85,20 +144,16 @@ class SearchResponse(BaseModel):
     message: str = "Search completed"
 
 
-class HeatmapCell(BaseModel):
-    grid_lat: float
-    grid_lng: float
-    place_count: int
-    avg_rating: Optional[float] = None
-    avg_price_level: Optional[float] = None
-
-    model_config = {"from_attributes": True}
-
+class HeatmapResponseColumnar(BaseModel):
+    """Heatmap cells as parallel arrays; index i across the lists is one cell."""
 
-class HeatmapResponse(BaseModel):
     category: str
     total_cells: int
-    cells: list[HeatmapCell]
+    grid_lat: list[float]
+    grid_lng: list[float]
+    place_count: list[int]
+    avg_rating: list[Optional[float]]
+    avg_price_level: list[Optional[float]]
 
 
 class LocationScoreOut(BaseModel):
@@ -6,11 +6,12 @@ heuristic features + lightweight ML classifier.
 from __future__ import annotations
 
 import re
-from typing import Optional
+from typing import Optional, Sequence
 
 import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select, update, values, column, Integer, String, Float
 
 from app.logging_config import logger
 from app.db.models import Place
@@ -30,6 +31,12 @@ KNOWN_BRANDS = {
     "7-eleven", "circle k", "shell", "bp", "total", "adnoc", "enoc",
 }
 
+# All brands as one alternation: a single C-level scan per name, same
+# substring semantics as checking each brand with `in`
+KNOWN_BRANDS_RE = re.compile(
+    "|".join(re.escape(b) for b in sorted(KNOWN_BRANDS, key=len, reverse=True))
+)
+
 # Typical chain/franchise patterns
 CHAIN_PATTERNS = re.compile(
     r"(franchise|chain|branch|outlet|store\s*#?\d|unit\s*\d|location\s*\d)",
@@ -41,6 +48,55 @@ BRAND_DOMAIN_INDICATORS = {
     ".com", ".co", ".global", ".international", ".inc",
 }
 
+# Country-specific TLDs that lean towards local businesses
+LOCAL_TLDS = (".ae", ".uk", ".in", ".ph", ".pk")
+
+# Precompiled forms of the two lists above. Like the original `ind in domain`
+# checks these match anywhere in the URL (".co" also hits ".com", ".in" also
+# hits ".info"), which the weights were tuned against.
+BRAND_DOMAIN_RE = re.compile("|".join(re.escape(i) for i in sorted(BRAND_DOMAIN_INDICATORS)))
+LOCAL_TLD_RE = re.compile("|".join(re.escape(t) for t in LOCAL_TLDS))
+
+BRAND_TYPES = {"shopping_mall", "department_store", "supermarket", "gas_station"}
+LOCAL_TYPES = {"cafe", "bakery", "hair_care", "laundry", "florist"}
+
+# Max possible score: 1.0 + 0.8 + 0.7 + 0.3 + 0.15 + 0.4 + 0.1 = 3.45
+MAX_SCORE = 3.45
+
+# Rows per classify_places UPDATE: 3 bind parameters a row keeps each
+# statement under asyncpg's 32767-parameter limit
+UPDATE_CHUNK_SIZE = 5000
+
+
+def _score_kernel(
+    has_brand: np.ndarray,
+    reviews: np.ndarray,
+    has_chain: np.ndarray,
+    brand_domain: np.ndarray,
+    local_tld: np.ndarray,
+    has_price: np.ndarray,
+    brand_type: np.ndarray,
+    local_type: np.ndarray,
+    word_counts: np.ndarray,
+) -> np.ndarray:
+    """
+    Weighted brand score from precomputed per-place signals.
+
+    Pure numeric: bool / int64 arrays in, float64 array out, no Python
+    objects — the signal extraction (regex, set membership) stays outside.
+    """
+    return (
+        1.0 * has_brand
+        + np.select([reviews > 1000, reviews > 500, reviews > 100], [0.8, 0.5, 0.2], 0.0)
+        + 0.7 * has_chain
+        + 0.3 * brand_domain
+        - 0.2 * local_tld
+        + 0.15 * has_price
+        + 0.4 * brand_type
+        - 0.3 * local_type
+        + np.select([word_counts <= 3, word_counts >= 6], [0.1, -0.1], 0.0)
+    )
+
 
 class BusinessClassifier:
     """
@@ -53,101 +109,86 @@ class BusinessClassifier:
         Returns (classification, confidence) where classification is
         'brand' or 'local' and confidence is 0.0-1.0.
         """
-        score = 0.0
-        signals = 0
-        max_signals = 7
+        return self.classify_batch([place])[0]
 
-        name_lower = (place.name or "").lower()
+    def classify_batch(self, places: Sequence[Place]) -> list[tuple[str, float]]:
+        """
+        Classify many places at once. String signals are extracted per place;
+        the weighted scoring runs as NumPy array ops over the whole batch.
+        """
+        if not places:
+            return []
 
-        # Signal 1: Known brand name match
-        for brand in KNOWN_BRANDS:
-            if brand in name_lower:
-                score += 1.0
-                signals += 1
-                break
-        else:
-            signals += 1
-
-        # Signal 2: High review count (brands tend to have more)
-        if place.user_ratings_total:
-            if place.user_ratings_total > 1000:
-                score += 0.8
-            elif place.user_ratings_total > 500:
-                score += 0.5
-            elif place.user_ratings_total > 100:
-                score += 0.2
-            signals += 1
-        else:
-            signals += 1
+        names = [(p.name or "").lower() for p in places]
+        domains = [(p.website or "").lower() for p in places]
+        type_sets = [set(p.types or []) for p in places]
+        reviews = np.array([p.user_ratings_total or 0 for p in places], dtype=np.int64)
+        word_counts = np.array([len(name.split()) for name in names], dtype=np.int64)
 
-        # Signal 3: Chain pattern in name/address
-        text_to_check = f"{place.name} {place.formatted_address or ''}"
-        if CHAIN_PATTERNS.search(text_to_check):
-            score += 0.7
-        signals += 1
-
-        # Signal 4: Website domain analysis
-        if place.website:
-            domain = place.website.lower()
-            # Multi-location brands often have clean .com domains
-            if any(ind in domain for ind in BRAND_DOMAIN_INDICATORS):
-                score += 0.3
-            # Local businesses more likely to have country-specific TLDs
-            if any(tld in domain for tld in (".ae", ".uk", ".in", ".ph", ".pk")):
-                score -= 0.2
-        signals += 1
+        # Signal 2 (review count) and 7 (name length) are thresholded inside
+        # _score_kernel straight from `reviews` / `word_counts`.
 
+        # Signal 1: Known brand name match
+        has_brand = np.array([KNOWN_BRANDS_RE.search(name) is not None for name in names])
+        # Signal 3: Chain pattern in name/address
+        has_chain = np.array([
+            CHAIN_PATTERNS.search(f"{p.name} {p.formatted_address or ''}") is not None
+            for p in places
+        ])
+        # Signal 4: Website domain analysis — multi-location brands often have
+        # clean .com domains, locals more likely country-specific TLDs
+        brand_domain = np.array([BRAND_DOMAIN_RE.search(d) is not None for d in domains])
+        local_tld = np.array([LOCAL_TLD_RE.search(d) is not None for d in domains])
         # Signal 5: Price level consistency (brands tend to have defined pricing)
-        if place.price_level is not None:
-            score += 0.15  # Having price_level set slightly favors brand
-        signals += 1
-
+        has_price = np.array([p.price_level is not None for p in places])
         # Signal 6: Business type analysis
-        types = place.types or []
-        brand_types = {"shopping_mall", "department_store", "supermarket", "gas_station"}
-        local_types = {"cafe", "bakery", "hair_care", "laundry", "florist"}
-        if any(t in brand_types for t in types):
-            score += 0.4
-        if any(t in local_types for t in types):
-            score -= 0.3
-        signals += 1
-
-        # Signal 7: Name length / complexity (brands often shorter, standardized)
-        words = name_lower.split()
-        if len(words) <= 3:
-            score += 0.1
-        elif len(words) >= 6:
-            score -= 0.1
-        signals += 1
-
-        # Normalize to 0-1 using the realistic max score
-        # Max possible score: 1.0 + 0.8 + 0.7 + 0.3 + 0.15 + 0.4 + 0.1 = 3.45
-        max_possible = 3.45
-        confidence = max(0.0, min(1.0, score / max_possible))
+        brand_type = np.array([not BRAND_TYPES.isdisjoint(t) for t in type_sets])
+        local_type = np.array([not LOCAL_TYPES.isdisjoint(t) for t in type_sets])
 
-        classification = "brand" if confidence >= 0.30 else "local"
+        score = _score_kernel(
+            has_brand, reviews, has_chain, brand_domain, local_tld,
+            has_price, brand_type, local_type, word_counts,
+        )
 
-        return classification, round(confidence, 3)
+        # Normalize to 0-1 using the realistic max score
+        confidence = np.clip(score / MAX_SCORE, 0.0, 1.0)
+        labels = np.where(confidence >= 0.30, "brand", "local")
+        return list(zip(labels.tolist(), np.round(confidence, 3).tolist()))
 
     async def classify_places(
         self, db: AsyncSession, places: list[Place]
     ) -> list[Place]:
         """Classify and persist classification for a batch of places."""
-        for place in places:
-            classification, confidence = self.classify(place)
-            place.classification = classification
-            place.classification_confidence = confidence
+        if not places:
+            return places
+
+        rows: list[tuple[int, str, float]] = []
+        for place, (classification, confidence) in zip(places, self.classify_batch(places)):
+            # Loaded as already-persisted: the bulk UPDATE below writes them,
+            # so the ORM must not flush a second per-row UPDATE on commit
+            set_committed_value(place, "classification", classification)
+            set_committed_value(place, "classification_confidence", confidence)
+            rows.append((place.id, classification, confidence))
+            logger.debug(
+                f"Classified {place.name}: {classification} ({confidence:.1%})"
+            )
 
+        # UPDATE places ... FROM (VALUES ...) v — one statement per chunk
+        for start in range(0, len(rows), UPDATE_CHUNK_SIZE):
+            batch = values(
+                column("id", Integer),
+                column("classification", String),
+                column("confidence", Float),
+                name="v",
+            ).data(rows[start:start + UPDATE_CHUNK_SIZE])
             await db.execute(
                 update(Place)
-                .where(Place.id == place.id)
+                .where(Place.id == batch.c.id)
                 .values(
-                    classification=classification,
-                    classification_confidence=confidence,
+                    classification=batch.c.classification,
+                    classification_confidence=batch.c.confidence,
                 )
-            )
-            logger.debug(
-                f"Classified {place.name}: {classification} ({confidence:.1%})"
+                .execution_options(synchronize_session=False)
             )
 
         await db.commit()
@@ -5,13 +5,16 @@ Respects robots.txt, uses async HTTP, regex-based email extraction.
 
 from __future__ import annotations
 
-import datetime
+import asyncio
 import re
+from collections import defaultdict
+from html import unescape as html_unescape
 from typing import Optional
 from urllib.parse import urljoin, urlparse
 
 import httpx
-from bs4 import BeautifulSoup
+from cachetools import TTLCache
+from selectolax.lexbor import LexborHTMLParser
 from protego import Protego
 from tenacity import (
     retry,
@@ -24,22 +27,48 @@ from sqlalchemy import select
 
 from app.config import get_settings
 from app.logging_config import logger
-from app.db.models import Place, PlaceEmail, PlaceEnrichment
+from app.db.models import Place, PlaceEmail, PlaceEnrichment, utc_now
 
 settings = get_settings()
 
-# Pre-compiled email regex — catches standard email patterns
+# Pre-compiled email regex — catches standard email patterns. Runs on the
+# raw response bytes, so pages are never decoded just to be scanned.
+# The lookbehind only lets a match start at the beginning of a run of
+# local-part characters; without it, every position inside a long '@'-free
+# run (inline base64, minified JS) rescans the rest of the run, which is
+# quadratic in the run length.
 EMAIL_REGEX = re.compile(
-    r"[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}",
-    re.IGNORECASE,
+    rb"(?<![a-zA-Z0-9._%+\-])[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}"
 )
 
+# Contact emails rarely appear past the first 512 KB; beyond that is mostly
+# inline scripts and data blobs not worth downloading or scanning
+MAX_PAGE_BYTES = 512 * 1024
+
+# <title> is near the top of the document; no DOM needed to read it
+TITLE_REGEX = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
 # Common false-positive email patterns to exclude
 EXCLUDED_EMAIL_PATTERNS = {
     "example.com", "domain.com", "email.com", "test.com",
     "yoursite.com", "website.com", "sentry.io", "wixpress.com",
 }
 
+# One rejection pass per candidate: image-asset names ("logo@2x.png") or an
+# excluded pattern anywhere in the domain part
+BAD_EMAIL_REGEX = re.compile(
+    r"\.(?:png|jpe?g|gif|svg|webp)$"
+    r"|@[^@]*(?:" + "|".join(re.escape(p) for p in sorted(EXCLUDED_EMAIL_PATTERNS)) + ")"
+)
+
+# How long a fetched robots.txt is trusted before re-fetching, and how many
+# origins' rules are kept (least recently used are dropped first)
+ROBOTS_TTL_SECONDS = 3600
+ROBOTS_CACHE_SIZE = 10_000
+
+# Cached "no usable robots.txt" is None, so misses need their own marker
+_ROBOTS_MISSING = object()
+
 # User agent for polite crawling
 USER_AGENT = "GooglePlacesEnrichmentBot/1.0 (+https://example.com/bot)"
 
@@ -49,11 +78,27 @@ CONTACT_LINK_PATTERNS = re.compile(
 )
 
 
+# (status code, body truncated to MAX_PAGE_BYTES, charset from Content-Type)
+_FetchedPage = tuple[int, bytes, Optional[str]]
+
+
+def _page_key(url: str) -> tuple[str, str, str, str]:
+    """Identity of the document a URL fetches: fragment and trailing slash ignored."""
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.netloc.lower(), parsed.path.rstrip("/"), parsed.query
+
+
 class WebsiteEnricher:
     """Extracts emails and metadata from place websites."""
 
     def __init__(self):
         self._client: Optional[httpx.AsyncClient] = None
+        # origin -> parsed robots.txt, or None when there is none to obey
+        self._robots: TTLCache[str, Optional[Protego]] = TTLCache(
+            maxsize=ROBOTS_CACHE_SIZE, ttl=ROBOTS_TTL_SECONDS
+        )
+        # Only held while an origin's robots.txt is being fetched
+        self._robots_locks: dict[str, asyncio.Lock] = {}
 
     async def _get_client(self) -> httpx.AsyncClient:
         if self._client is None or self._client.is_closed:
@@ -61,6 +106,7 @@ class WebsiteEnricher:
                 timeout=settings.enrichment_timeout,
                 follow_redirects=True,
                 headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
             )
         return self._client
 
@@ -70,21 +116,44 @@ class WebsiteEnricher:
 
     # ── robots.txt check ─────────────────────────────────────────
 
+    async def _robots_for(self, origin: str) -> Optional[Protego]:
+        """Parsed robots.txt for scheme://netloc, cached for ROBOTS_TTL_SECONDS.
+
+        None means "no usable robots.txt" (allow all). A per-origin lock keeps
+        concurrent crawls of the same host from fetching it twice.
+        """
+        cached = self._robots.get(origin, _ROBOTS_MISSING)
+        if cached is not _ROBOTS_MISSING:
+            return cached
+
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            cached = self._robots.get(origin, _ROBOTS_MISSING)
+            if cached is not _ROBOTS_MISSING:
+                return cached
+
+            rp: Optional[Protego] = None
+            try:
+                client = await self._get_client()
+                resp = await client.get(f"{origin}/robots.txt")
+                if resp.status_code == 200:
+                    rp = Protego.parse(resp.text)
+            except Exception:
+                pass
+            self._robots[origin] = rp
+            # Waiters already hold a reference; later callers hit the cache
+            self._robots_locks.pop(origin, None)
+            return rp
+
     async def _check_robots(self, base_url: str) -> bool:
         """Check if our bot is allowed to crawl the URL."""
         if not settings.respect_robots_txt:
             return True
-        try:
-            client = await self._get_client()
-            parsed = urlparse(base_url)
-            robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-            resp = await client.get(robots_url)
-            if resp.status_code == 200:
-                rp = Protego.parse(resp.text)
-                return rp.can_fetch(base_url, USER_AGENT)
-        except Exception:
-            pass
-        return True  # If can't fetch robots.txt, assume allowed
+        parsed = urlparse(base_url)
+        rp = await self._robots_for(f"{parsed.scheme}://{parsed.netloc}")
+        if rp is None:
+            return True  # If can't fetch robots.txt, assume allowed
+        return rp.can_fetch(base_url, USER_AGENT)
 
     # ── HTML fetch ───────────────────────────────────────────────
 
@@ -94,60 +163,77 @@ class WebsiteEnricher:
         retry=retry_if_exception_type((httpx.ConnectError, httpx.ReadTimeout)),
         reraise=True,
     )
-    async def _fetch_page(self, url: str) -> tuple[int, str]:
+    async def _fetch_page(self, url: str) -> _FetchedPage:
+        """GET a page, reading at most MAX_PAGE_BYTES of the body."""
         client = await self._get_client()
-        resp = await client.get(url)
-        return resp.status_code, resp.text
+        async with client.stream("GET", url) as resp:
+            chunks: list[bytes] = []
+            size = 0
+            async for chunk in resp.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_PAGE_BYTES:
+                    break
+            body = b"".join(chunks)[:MAX_PAGE_BYTES]
+            return resp.status_code, body, resp.charset_encoding
 
     # ── Email extraction ─────────────────────────────────────────
 
     @staticmethod
-    def _extract_emails(html: str) -> set[str]:
-        """Extract email addresses from HTML, filtering false positives."""
-        raw = set(EMAIL_REGEX.findall(html))
-        cleaned = set()
-        for email in raw:
-            email_lower = email.lower()
-            domain = email_lower.split("@")[1] if "@" in email_lower else ""
-            # Skip image files and excluded domains
-            if any(email_lower.endswith(ext) for ext in (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")):
-                continue
-            if any(exc in domain for exc in EXCLUDED_EMAIL_PATTERNS):
-                continue
-            cleaned.add(email_lower)
-        return cleaned
+    def _extract_emails(html: bytes) -> set[str]:
+        """Extract email addresses from raw HTML bytes, filtering false positives."""
+        raw = {m.decode("ascii").lower() for m in EMAIL_REGEX.findall(html)}
+        # Skip image files and excluded domains
+        return {email for email in raw if not BAD_EMAIL_REGEX.search(email)}
 
     # ── Contact page discovery ───────────────────────────────────
 
     @staticmethod
-    def _find_contact_page(html: str, base_url: str) -> Optional[str]:
-        """Find a contact page link in the HTML."""
-        soup = BeautifulSoup(html, "lxml")
-        for a in soup.find_all("a", href=True):
-            text = a.get_text(strip=True).lower()
-            href = a["href"].lower()
+    def _find_contact_page(tree: LexborHTMLParser, base_url: str) -> Optional[str]:
+        """Find a contact page link in the parsed HTML."""
+        for a in tree.css("a[href]"):
+            raw_href = a.attributes.get("href") or ""
+            text = a.text(strip=True).lower()
+            href = raw_href.lower()
             if CONTACT_LINK_PATTERNS.search(text) or CONTACT_LINK_PATTERNS.search(href):
-                url = urljoin(base_url, a["href"])
+                url = urljoin(base_url, raw_href)
                 # Only follow same-domain links
                 if urlparse(url).netloc == urlparse(base_url).netloc:
                     return url
         return None
 
     @staticmethod
-    def _extract_title(html: str) -> Optional[str]:
-        soup = BeautifulSoup(html, "lxml")
-        title = soup.find("title")
-        return title.get_text(strip=True) if title else None
+    def _extract_title(html: bytes, charset: Optional[str] = None) -> Optional[str]:
+        """<title> text, decoded with the response charset (UTF-8 if absent or unknown)."""
+        match = TITLE_REGEX.search(html)
+        if not match:
+            return None
+        try:
+            title = match.group(1).decode(charset or "utf-8", errors="replace")
+        except LookupError:
+            title = match.group(1).decode("utf-8", errors="replace")
+        return html_unescape(title.strip())[:500]
 
     # ── Main enrichment method ───────────────────────────────────
 
-    async def enrich_place(
-        self, db: AsyncSession, place: Place
-    ) -> Place:
-        """Enrich a single place with website data."""
-        if not place.website:
-            return place
-
+    async def _fetch_memo(
+        self, url: str, pages: dict[tuple, _FetchedPage]
+    ) -> _FetchedPage:
+        """_fetch_page, reusing a page already fetched into `pages`."""
+        key = _page_key(url)
+        if key not in pages:
+            pages[key] = await self._fetch_page(url)
+        return pages[key]
+
+    async def _crawl(
+        self, place: Place, pages: Optional[dict[tuple, _FetchedPage]] = None
+    ) -> tuple[dict, dict[str, str]]:
+        """
+        Fetch a place's website; returns (enrichment_data, emails). HTTP only,
+        no DB. `pages` memoises fetched documents, e.g. across a batch where
+        several branches of a chain share one website.
+        """
+        pages = {} if pages is None else pages
         website = place.website
         logger.info(f"Enriching place={place.name} url={website}")
 
@@ -167,16 +253,14 @@ class WebsiteEnricher:
 
             if not allowed:
                 enrichment_data["enrichment_error"] = "Blocked by robots.txt"
-                await self._save_enrichment(db, place.id, enrichment_data, all_emails)
-                place.enriched_at = datetime.datetime.utcnow()
-                return place
+                return enrichment_data, all_emails
 
             # Fetch homepage
-            status, html = await self._fetch_page(website)
+            status, html, charset = await self._fetch_memo(website, pages)
             enrichment_data["homepage_status_code"] = status
 
             if status == 200 and html:
-                enrichment_data["homepage_title"] = self._extract_title(html)
+                enrichment_data["homepage_title"] = self._extract_title(html, charset)
 
                 # Extract emails from homepage
                 homepage_emails = self._extract_emails(html)
@@ -184,11 +268,13 @@ class WebsiteEnricher:
                     all_emails[e] = "homepage"
 
                 # Find and crawl contact page
-                contact_url = self._find_contact_page(html, website)
+                contact_url = self._find_contact_page(LexborHTMLParser(html), website)
                 if contact_url:
                     enrichment_data["contact_page_url"] = contact_url
+                # Single-page sites link "/#contact": that page was just scanned
+                if contact_url and _page_key(contact_url) != _page_key(website):
                     try:
-                        cp_status, cp_html = await self._fetch_page(contact_url)
+                        cp_status, cp_html, _ = await self._fetch_memo(contact_url, pages)
                         if cp_status == 200 and cp_html:
                             contact_emails = self._extract_emails(cp_html)
                             for e in contact_emails:
@@ -201,9 +287,21 @@ class WebsiteEnricher:
             enrichment_data["enrichment_error"] = str(exc)[:500]
             logger.error(f"Enrichment error for {place.name}: {exc}")
 
+        return enrichment_data, all_emails
+
+    async def enrich_place(
+        self, db: AsyncSession, place: Place
+    ) -> Place:
+        """Enrich a single place with website data."""
+        if not place.website:
+            return place
+
+        enrichment_data, all_emails = await self._crawl(place)
         await self._save_enrichment(db, place.id, enrichment_data, all_emails)
-        place.enriched_at = datetime.datetime.utcnow()
+        place.enriched_at = utc_now()
         await db.commit()
+        # Stamped by PostgreSQL, so the flush leaves the attribute expired
+        await db.refresh(place, ["enriched_at"])
         return place
 
     # ── Persistence ──────────────────────────────────────────────
@@ -241,13 +339,45 @@ class WebsiteEnricher:
     async def enrich_places_batch(
         self, db: AsyncSession, places: list[Place]
     ) -> list[Place]:
-        """Enrich a batch of places sequentially (polite crawling)."""
-        enriched = []
+        """
+        Enrich a batch of places. Sites are crawled concurrently across hosts
+        but one at a time per host (polite crawling). Each host group is saved
+        and committed as soon as it finishes, so a DB error or a shutdown only
+        loses the group in flight; groups take turns, since the session can't
+        be shared between tasks.
+        """
+        by_host: dict[str, list[Place]] = defaultdict(list)
         for place in places:
-            try:
-                p = await self.enrich_place(db, place)
-                enriched.append(p)
-            except Exception as exc:
-                logger.error(f"Batch enrichment failed for {place.name}: {exc}")
-                enriched.append(place)
-        return enriched
+            if place.website:
+                by_host[urlparse(place.website).netloc].append(place)
+
+        limit = asyncio.Semaphore(settings.enrichment_concurrency)
+        save_lock = asyncio.Lock()
+
+        async def crawl_host(host_places: list[Place]):
+            # Places sharing a website share its host, so memoising per host
+            # group still fetches a chain's site once, and its page bodies are
+            # released as soon as the group is done
+            pages: dict[tuple, _FetchedPage] = {}
+            crawled: list[tuple[Place, tuple[dict, dict[str, str]]]] = []
+            for place in host_places:
+                async with limit:
+                    try:
+                        crawled.append((place, await self._crawl(place, pages)))
+                    except Exception as exc:
+                        logger.error(f"Batch enrichment failed for {place.name}: {exc}")
+
+            async with save_lock:
+                for place, (enrichment_data, emails) in crawled:
+                    try:
+                        # A failing place rolls back to its savepoint alone,
+                        # leaving the session (and the rest of the group) usable
+                        async with db.begin_nested():
+                            await self._save_enrichment(db, place.id, enrichment_data, emails)
+                        place.enriched_at = utc_now()
+                    except Exception as exc:
+                        logger.error(f"Batch enrichment failed for {place.name}: {exc}")
+                await db.commit()
+
+        await asyncio.gather(*(crawl_host(group) for group in by_host.values()))
+        return places
@@ -0,0 +1,82 @@
+"""
+In-process enrichment work queue: searches submit place ids, a fixed pool of
+workers drains them in coalesced, de-duplicated batches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Iterable
+
+from app.logging_config import logger
+
+
+class EnrichmentQueue:
+    """
+    Bounded-concurrency consumer for background enrichment.
+
+    Every id batch submitted within `batch_window` seconds of the first one is
+    merged into a single handler call, so overlapping searches enrich each
+    place once and share one session / one refetch. Ids already being handled
+    by another worker are skipped.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[int]], Awaitable[None]],
+        workers: int = 2,
+        batch_window: float = 0.1,
+    ):
+        self._handler = handler
+        self._worker_count = workers
+        self._batch_window = batch_window
+        self._queue: asyncio.Queue[list[int]] = asyncio.Queue()
+        self._in_flight: set[int] = set()
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        """Spawn the worker tasks on the running loop."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"enrichment-worker-{i}")
+            for i in range(self._worker_count)
+        ]
+
+    async def stop(self):
+        """Cancel the workers; pending ids are dropped."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, place_ids: Iterable[int]):
+        """Queue place ids for enrichment, classification and scoring."""
+        ids = list(place_ids)
+        if ids:
+            self._queue.put_nowait(ids)
+
+    async def _next_batch(self) -> list[int]:
+        """Block for one submission, then fold in everything else that arrives within the window."""
+        batch = dict.fromkeys(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._batch_window
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                batch.update(dict.fromkeys(await asyncio.wait_for(self._queue.get(), remaining)))
+            except asyncio.TimeoutError:
+                break
+        return [pid for pid in batch if pid not in self._in_flight]
+
+    async def _worker(self):
+        while True:
+            place_ids = await self._next_batch()
+            if not place_ids:
+                continue
+            self._in_flight.update(place_ids)
+            try:
+                await self._handler(place_ids)
+            except Exception as exc:
+                logger.error(f"Enrichment batch of {len(place_ids)} places failed: {exc}")
+            finally:
+                self._in_flight.difference_update(place_ids)
@@ -5,16 +5,61 @@ in a grid overlay for a given category/area.
 
 from __future__ import annotations
 
-import datetime
 import math
+from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, delete
+from sqlalchemy import select, func, and_, delete, cast
 from sqlalchemy.dialects.postgresql import insert as pg_insert
+from geoalchemy2 import Geography
 
 from app.logging_config import logger
-from app.db.models import Place, CompetitorHeatmap
+from app.db.models import Place, CompetitorHeatmap, utc_now
+
+
+@dataclass
+class HeatmapGrid:
+    """Heatmap cells as parallel (structure-of-arrays) columns."""
+
+    grid_lat: np.ndarray
+    grid_lng: np.ndarray
+    place_count: np.ndarray
+    avg_rating: np.ndarray  # NaN where a cell has no rated places
+    avg_price_level: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.place_count)
+
+
+def scatter_cells(
+    rows,
+    lat_steps: int,
+    lng_steps: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Spread aggregated (gi, gj, count, avg_rating, avg_price) rows of the
+    non-empty cells onto a dense row-major grid.
+
+    Returns flat arrays of length lat_steps * lng_steps: place counts (0 for
+    empty cells) and mean rating / price level (NaN where a cell has no values).
+    """
+    n_cells = lat_steps * lng_steps
+    data = np.array(rows, dtype=np.float64).reshape(-1, 5)  # None -> NaN
+    gi = data[:, 0].astype(np.int64)
+    gj = data[:, 1].astype(np.int64)
+    inside = (gi >= 0) & (gi < lat_steps) & (gj >= 0) & (gj < lng_steps)
+    flat = gi[inside] * lng_steps + gj[inside]
+
+    counts = np.zeros(n_cells, dtype=np.int64)
+    avg_ratings = np.full(n_cells, np.nan)
+    avg_prices = np.full(n_cells, np.nan)
+    counts[flat] = data[inside, 2]
+    avg_ratings[flat] = data[inside, 3]
+    avg_prices[flat] = data[inside, 4]
+    return counts, avg_ratings, avg_prices
 
 
 class HeatmapEngine:
@@ -32,12 +77,13 @@ class HeatmapEngine:
         lng_min: float,
         lng_max: float,
         grid_size: float = 0.01,  # ~1.1 km at equator
-    ) -> list[CompetitorHeatmap]:
+    ) -> HeatmapGrid:
         """
         Compute and store the heatmap for a given category in a bounding box.
 
         Grid cells are identified by their SW corner (grid_lat, grid_lng).
-        Each cell stores the count of places and average metrics.
+        Each cell stores the count of places and average metrics; the result
+        is returned as parallel arrays in row-major (lat, lng) order.
         """
         logger.info(
             f"Computing heatmap: category={category}, "
@@ -63,69 +109,96 @@ class HeatmapEngine:
             delete(CompetitorHeatmap).where(
                 and_(
                     CompetitorHeatmap.category == category,
-                    CompetitorHeatmap.grid_lat >= lat_min,
-                    CompetitorHeatmap.grid_lat <= lat_max,
-                    CompetitorHeatmap.grid_lng >= lng_min,
-                    CompetitorHeatmap.grid_lng <= lng_max,
+                    CompetitorHeatmap.geom.op("&&")(
+                        func.ST_MakeEnvelope(lng_min, lat_min, lng_max, lat_max, 4326)
+                    ),
                 )
             )
         )
 
-        cells: list[CompetitorHeatmap] = []
-
-        for i in range(lat_steps):
-            cell_lat = lat_min + i * grid_size
-            cell_lat_max = cell_lat + grid_size
-
-            for j in range(lng_steps):
-                cell_lng = lng_min + j * grid_size
-                cell_lng_max = cell_lng + grid_size
-
-                # Query places in this cell matching the category
-                # Category match: check if any of place.types contains the category
-                query = select(
-                    func.count(Place.id).label("cnt"),
-                    func.avg(Place.rating).label("avg_rating"),
-                    func.avg(Place.price_level).label("avg_price"),
-                ).where(
-                    and_(
-                        Place.latitude >= cell_lat,
-                        Place.latitude < cell_lat_max,
-                        Place.longitude >= cell_lng,
-                        Place.longitude < cell_lng_max,
-                        Place.latitude.isnot(None),
-                        Place.longitude.isnot(None),
-                    )
+        # One GROUP BY over the bbox; only non-empty cells come back
+        lat_limit = lat_min + lat_steps * grid_size
+        lng_limit = lng_min + lng_steps * grid_size
+        bbox = func.ST_MakeEnvelope(lng_min, lat_min, lng_limit, lat_limit, 4326)
+        gi = func.floor((Place.latitude - lat_min) / grid_size).label("gi")
+        gj = func.floor((Place.longitude - lng_min) / grid_size).label("gj")
+        query = (
+            select(
+                gi,
+                gj,
+                func.count(Place.id),
+                func.avg(Place.rating),
+                func.avg(Place.price_level),
+            )
+            .where(
+                and_(
+                    # GiST (ix_places_geom_planar) prefilter on the planar
+                    # lng/lat box: unlike a geography box it has no geodesic
+                    # edges, needs no padding, and never wraps at ±180°
+                    func.geometry(Place.geom).op("&&")(bbox),
+                    Place.latitude >= lat_min,
+                    Place.latitude < lat_limit,
+                    Place.longitude >= lng_min,
+                    Place.longitude < lng_limit,
                 )
+            )
+            .group_by(gi, gj)
+        )
+        # If category specified, filter by search_query
+        if category != "*":
+            query = query.where(Place.search_query.ilike(f"%{category}%"))
 
-                # If category specified, filter by search_query or types
-                if category != "*":
-                    query = query.where(
-                        Place.search_query.ilike(f"%{category}%")
-                    )
-
-                result = await db.execute(query)
-                row = result.one()
-
-                cell_count = row.cnt or 0
-                avg_rating = round(float(row.avg_rating), 2) if row.avg_rating else None
-                avg_price = round(float(row.avg_price), 2) if row.avg_price else None
-
-                cell = CompetitorHeatmap(
-                    grid_lat=round(cell_lat, 6),
-                    grid_lng=round(cell_lng, 6),
-                    category=category,
-                    place_count=cell_count,
-                    avg_rating=avg_rating,
-                    avg_price_level=avg_price,
-                    computed_at=datetime.datetime.utcnow(),
+        rows = (await db.execute(query)).all()
+        counts, avg_ratings, avg_prices = scatter_cells(rows, lat_steps, lng_steps)
+
+        grid = HeatmapGrid(
+            grid_lat=np.repeat(np.round(lat_min + np.arange(lat_steps) * grid_size, 6), lng_steps),
+            grid_lng=np.tile(np.round(lng_min + np.arange(lng_steps) * grid_size, 6), lat_steps),
+            place_count=counts,
+            avg_rating=np.round(avg_ratings, 2),
+            avg_price_level=np.round(avg_prices, 2),
+        )
+
+        if not len(grid):
+            # Zero-width or zero-height bbox: no cells, and executemany with an
+            # empty parameter list would still send one (invalid) INSERT
+            await db.commit()
+            return grid
+
+        # Batched multi-row upsert; a concurrent compute for the same cells
+        # (or a float-rounded corner that survived the delete) just overwrites
+        stmt = pg_insert(CompetitorHeatmap)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_heatmap_cell",
+            set_={
+                **{c: stmt.excluded[c] for c in ("place_count", "avg_rating", "avg_price_level")},
+                "computed_at": utc_now(),
+            },
+        )
+        await db.execute(
+            stmt,
+            [
+                {
+                    "grid_lat": lat,
+                    "grid_lng": lng,
+                    "category": category,
+                    "place_count": count,
+                    "avg_rating": None if math.isnan(rating) else rating,
+                    "avg_price_level": None if math.isnan(price) else price,
+                }
+                for lat, lng, count, rating, price in zip(
+                    grid.grid_lat.tolist(),
+                    grid.grid_lng.tolist(),
+                    grid.place_count.tolist(),
+                    grid.avg_rating.tolist(),
+                    grid.avg_price_level.tolist(),
                 )
-                db.add(cell)
-                cells.append(cell)
+            ],
+        )
 
         await db.commit()
-        logger.info(f"Heatmap computed: {len(cells)} cells for category={category}")
-        return cells
+        logger.info(f"Heatmap computed: {len(grid)} cells for category={category}")
+        return grid
 
     async def get_heatmap(
         self,
@@ -140,14 +213,21 @@ class HeatmapEngine:
         query = select(CompetitorHeatmap).where(
             CompetitorHeatmap.category == category
         )
-        if lat_min is not None:
-            query = query.where(CompetitorHeatmap.grid_lat >= lat_min)
-        if lat_max is not None:
-            query = query.where(CompetitorHeatmap.grid_lat <= lat_max)
-        if lng_min is not None:
-            query = query.where(CompetitorHeatmap.grid_lng >= lng_min)
-        if lng_max is not None:
-            query = query.where(CompetitorHeatmap.grid_lng <= lng_max)
+        if None not in (lat_min, lat_max, lng_min, lng_max):
+            query = query.where(
+                CompetitorHeatmap.geom.op("&&")(
+                    func.ST_MakeEnvelope(lng_min, lat_min, lng_max, lat_max, 4326)
+                )
+            )
+        else:
+            if lat_min is not None:
+                query = query.where(CompetitorHeatmap.grid_lat >= lat_min)
+            if lat_max is not None:
+                query = query.where(CompetitorHeatmap.grid_lat <= lat_max)
+            if lng_min is not None:
+                query = query.where(CompetitorHeatmap.grid_lng >= lng_min)
+            if lng_max is not None:
+                query = query.where(CompetitorHeatmap.grid_lng <= lng_max)
 
         query = query.order_by(CompetitorHeatmap.grid_lat, CompetitorHeatmap.grid_lng)
         result = await db.execute(query)
@@ -161,21 +241,15 @@ class HeatmapEngine:
         radius_km: float = 2.0,
     ) -> dict:
         """Get competitor density metrics around a specific point."""
-        # Approximate degrees for radius
-        lat_delta = radius_km / 111.0
-        lng_delta = radius_km / (111.0 * math.cos(math.radians(lat)))
+        # ST_DWithin on geography is metre-based and served by ix_places_geom
+        center = cast(func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326), Geography)
 
         result = await db.execute(
             select(
                 func.count(Place.id).label("count"),
                 func.avg(Place.rating).label("avg_rating"),
                 func.avg(Place.user_ratings_total).label("avg_reviews"),
-            ).where(
-                and_(
-                    Place.latitude.between(lat - lat_delta, lat + lat_delta),
-                    Place.longitude.between(lng - lng_delta, lng + lng_delta),
-                )
-            )
+            ).where(func.ST_DWithin(Place.geom, center, radius_km * 1000))
         )
         row = result.one()
         return {
@@ -12,35 +12,104 @@ Migrated from the legacy Places API to the Places API (New):
 from __future__ import annotations
 
 import asyncio
-import datetime
+import json
 from typing import Optional
 
 import httpx
+import orjson
 from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
 from tenacity import (
+    RetryCallState,
     retry,
+    retry_if_exception,
     stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
+    wait_exponential_jitter,
 )
-from sqlalchemy import select
+from sqlalchemy import select, text, table, column, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.config import get_settings
 from app.logging_config import logger
-from app.db.models import Place
+from app.db.models import Place, utc_now
 
 settings = get_settings()
 
-# ── Rate limiter: max N requests per second ──────────────────────
+# ── Rate limiters: per-second pacing + per-minute quota ──────────
+# Capacity 1 spaces requests 1/N s apart instead of letting N through at the
+# start of every second; the minute limiter keeps us under the project quota.
 _rate_limiter = AsyncLimiter(
-    max_rate=settings.max_requests_per_second,
-    time_period=1,
+    max_rate=1,
+    time_period=1.0 / settings.max_requests_per_second,
 )
+_minute_limiter = AsyncLimiter(
+    max_rate=settings.max_requests_per_minute,
+    time_period=60,
+)
+# Caps requests in flight (and tasks parked in the limiters) independently of
+# the rate, so a wide grid search can't oversubscribe the connection pool
+MAX_CONCURRENT_REQUESTS = 16
+_request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# ── Retry policy ─────────────────────────────────────────────────
+# Jittered so parallel callers hitting the same 429/5xx burst don't retry in
+# lockstep; a 429 with Retry-After waits as long as the API asks.
+_backoff = wait_exponential_jitter(initial=2, max=30, jitter=2)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, (httpx.ConnectError, httpx.TimeoutException))
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+        retry_after = exc.response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), 60.0)
+    return _backoff(retry_state)
+
+
+_places_retry = retry(
+    stop=stop_after_attempt(settings.enrichment_max_retries),
+    wait=_retry_wait,
+    retry=retry_if_exception(_is_retryable),
+    reraise=True,
+)
+
+# Grid sub-searches allowed in flight at once
+GRID_SEARCH_CONCURRENCY = 8
+
+# ── Shared HTTP client ───────────────────────────────────────────
+# Every call goes to places.googleapis.com, so one pooled HTTP/2 client keeps
+# the TLS session alive across searches and GooglePlacesClient instances.
+_SHARED_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _shared_client() -> httpx.AsyncClient:
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None or _SHARED_CLIENT.is_closed:
+        _SHARED_CLIENT = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30, connect=10),
+            limits=httpx.Limits(
+                max_keepalive_connections=64,
+                max_connections=128,
+                keepalive_expiry=30,
+            ),
+        )
+    return _SHARED_CLIENT
 
-# ── In-memory place_id cache for dedup within a session ──────────
-_place_id_cache: set[str] = set()
+
+# ── Place Details cache ──────────────────────────────────────────
+# Bounded, expiring cache of successful details payloads, plus the fetches
+# currently in progress so overlapping grid cells share one request per id.
+_details_cache: TTLCache[str, dict] = TTLCache(maxsize=50_000, ttl=86_400)
+_details_inflight: dict[str, asyncio.Future] = {}
 
 # ── Google Places API (New) constants ────────────────────────────
 TEXT_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
@@ -72,27 +141,19 @@ _PRICE_LEVEL_MAP = {
 }
 
 
+_price_level = _PRICE_LEVEL_MAP.get
+
+
 def _normalize_place(raw: dict) -> dict:
     """
     Convert a Places API (New) place object into the flat dict format
     expected by the rest of the application (matching our DB model fields).
     """
-    display_name = raw.get("displayName", {})
-    location = raw.get("location", {})
+    location = raw.get("location") or {}
     opening = raw.get("regularOpeningHours")
-    opening_dict = None
-    if opening:
-        opening_dict = {
-            "open_now": opening.get("openNow"),
-            "weekday_text": opening.get("weekdayDescriptions", []),
-        }
-
-    price_str = raw.get("priceLevel")
-    price_int = _PRICE_LEVEL_MAP.get(price_str) if price_str else None
-
     return {
         "place_id": raw.get("id", ""),
-        "name": display_name.get("text", ""),
+        "name": (raw.get("displayName") or {}).get("text", ""),
         "formatted_address": raw.get("formattedAddress"),
         "latitude": location.get("latitude"),
         "longitude": location.get("longitude"),
@@ -100,20 +161,20 @@ def _normalize_place(raw: dict) -> dict:
         "user_ratings_total": raw.get("userRatingCount"),
         "formatted_phone_number": raw.get("nationalPhoneNumber"),
         "website": raw.get("websiteUri"),
-        "opening_hours": opening_dict,
+        "opening_hours": {
+            "open_now": opening.get("openNow"),
+            "weekday_text": opening.get("weekdayDescriptions", []),
+        } if opening else None,
         "address_components": raw.get("addressComponents"),
         "types": raw.get("types"),
         "business_status": raw.get("businessStatus"),
-        "price_level": price_int,
+        "price_level": _price_level(raw.get("priceLevel")),
     }
 
 
 class GooglePlacesClient:
     """Async Google Places API (New) client with built-in pagination and retry."""
 
-    def __init__(self):
-        self._client: Optional[httpx.AsyncClient] = None
-
     def _headers(self, field_mask: str) -> dict:
         """Common headers for Places API (New) requests."""
         return {
@@ -123,22 +184,16 @@ class GooglePlacesClient:
         }
 
     async def _get_client(self) -> httpx.AsyncClient:
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=30)
-        return self._client
+        return _shared_client()
 
     async def close(self):
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
+        """Close the shared HTTP client (called once at app shutdown)."""
+        if _SHARED_CLIENT is not None and not _SHARED_CLIENT.is_closed:
+            await _SHARED_CLIENT.aclose()
 
     # ── Text Search with pagination ──────────────────────────────
 
-    @retry(
-        stop=stop_after_attempt(settings.enrichment_max_retries),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.ConnectError)),
-        reraise=True,
-    )
+    @_places_retry
     async def _text_search_page(
         self,
         query: str,
@@ -146,7 +201,7 @@ class GooglePlacesClient:
         radius: Optional[int] = None,
         page_token: Optional[str] = None,
     ) -> dict:
-        async with _rate_limiter:
+        async with _request_slots, _minute_limiter, _rate_limiter:
             client = await self._get_client()
 
             body: dict = {
@@ -179,7 +234,7 @@ class GooglePlacesClient:
                 headers=self._headers(TEXT_SEARCH_FIELD_MASK),
             )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
 
             # The new API returns HTTP errors directly (4xx/5xx) instead of
             # in-body status codes, but check for error object just in case
@@ -210,13 +265,12 @@ class GooglePlacesClient:
             all_results.extend(results)
             logger.info(f"Page {page + 1}: {len(results)} results (total {len(all_results)})")
 
+            # Places API (New) page tokens are usable immediately; the rate
+            # limiters already space the follow-up requests
             page_token = data.get("nextPageToken")
             if not page_token:
                 break
 
-            # Small delay between pages for politeness
-            await asyncio.sleep(0.5)
-
         return all_results
 
     async def grid_search(
@@ -266,58 +320,68 @@ class GooglePlacesClient:
         all_results: list[dict] = []
         cell_radius_m = int(cell_radius_km * 1000 * 1.3)  # 30% overlap
 
-        for i, (lat, lng) in enumerate(grid_centers):
-            location_str = f"{lat},{lng}"
-            try:
-                results = await self.text_search(
-                    query=query,
-                    location=location_str,
-                    radius=cell_radius_m,
-                    max_pages=max_pages,
-                )
-                new_count = 0
-                for place in results:
-                    pid = place.get("id", "")
-                    if pid and pid not in seen_ids:
-                        seen_ids.add(pid)
-                        all_results.append(place)
-                        new_count += 1
-                logger.info(
-                    f"Grid cell {i+1}/{len(grid_centers)}: "
-                    f"{len(results)} raw, {new_count} new (total unique: {len(all_results)})"
-                )
-            except Exception as exc:
-                logger.error(f"Grid cell {i+1} failed: {exc}")
+        # Sub-searches run concurrently; _rate_limiter still paces the
+        # requests, the semaphore just bounds how many cells are in flight
+        sem = asyncio.Semaphore(GRID_SEARCH_CONCURRENCY)
+
+        async def search_cell(i: int, lat: float, lng: float):
+            async with sem:
+                try:
+                    return i, await self.text_search(
+                        query=query,
+                        location=f"{lat},{lng}",
+                        radius=cell_radius_m,
+                        max_pages=max_pages,
+                    )
+                except Exception as exc:
+                    logger.error(f"Grid cell {i+1} failed: {exc}")
+                    return i, []
+
+        cells = [search_cell(i, lat, lng) for i, (lat, lng) in enumerate(grid_centers)]
+        for done, next_cell in enumerate(asyncio.as_completed(cells), start=1):
+            i, results = await next_cell
+            new_count = 0
+            for place in results:
+                pid = place.get("id", "")
+                if pid and pid not in seen_ids:
+                    seen_ids.add(pid)
+                    all_results.append(place)
+                    new_count += 1
+            logger.info(
+                f"Grid cell {i+1}/{len(grid_centers)}: "
+                f"{len(results)} raw, {new_count} new (total unique: {len(all_results)})"
+            )
 
             # Fire progress callback
             if on_progress:
                 try:
-                    await on_progress(i + 1, len(grid_centers), len(all_results))
+                    await on_progress(done, len(grid_centers), len(all_results))
                 except Exception:
                     pass
 
-            # Small delay between sub-searches
-            await asyncio.sleep(0.3)
-
         logger.info(f"Grid search complete: {len(all_results)} unique results")
         return all_results
 
     # ── Place Details ────────────────────────────────────────────
 
-    @retry(
-        stop=stop_after_attempt(settings.enrichment_max_retries),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.ConnectError)),
-        reraise=True,
-    )
     async def get_place_details(self, place_id: str) -> dict:
-        """Fetch place details via Places API (New)."""
-        # Check in-memory cache
-        if place_id in _place_id_cache:
+        """Fetch place details via Places API (New); {} if the API reports an error."""
+        cached = _details_cache.get(place_id)
+        if cached is not None:
             logger.debug(f"Cache hit for place_id={place_id}")
-            return {}
-
-        async with _rate_limiter:
+            return cached
+
+        future = _details_inflight.get(place_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_place_details(place_id))
+            _details_inflight[place_id] = future
+            future.add_done_callback(lambda _: _details_inflight.pop(place_id, None))
+        # Shielded so one cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(future)
+
+    @_places_retry
+    async def _fetch_place_details(self, place_id: str) -> dict:
+        async with _request_slots, _minute_limiter, _rate_limiter:
             client = await self._get_client()
             url = f"{PLACE_DETAILS_URL}/{place_id}"
 
@@ -326,18 +390,103 @@ class GooglePlacesClient:
                 headers=self._headers(DETAILS_FIELD_MASK),
             )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
 
             if "error" in data:
                 logger.warning(f"Place details error for {place_id}: {data['error']}")
                 return {}
 
-            _place_id_cache.add(place_id)
+            _details_cache[place_id] = data
             return data
 
 
 # ── Persistence helpers ──────────────────────────────────────────
 
+# Batches at least this large go through COPY instead of per-row upserts
+COPY_THRESHOLD = 100
+
+# Columns written by upsert_places, in staging-table order
+_UPSERT_COLUMNS = (
+    "place_id", "name", "formatted_address", "latitude", "longitude",
+    "rating", "user_ratings_total", "formatted_phone_number", "website",
+    "opening_hours", "address_components", "types", "business_status",
+    "price_level", "search_query", "search_location",
+)
+_JSON_COLUMNS = {"opening_hours", "address_components", "types"}
+
+# Columns refreshed on conflict (search context keeps its first value)
+_UPDATE_COLUMNS = tuple(
+    c for c in _UPSERT_COLUMNS if c not in ("place_id", "search_query", "search_location")
+)
+
+
+def _upsert_on_conflict(stmt):
+    """ON CONFLICT (place_id) refresh shared by both upsert paths."""
+    return stmt.on_conflict_do_update(
+        index_elements=["place_id"],
+        set_={
+            **{c: stmt.excluded[c] for c in _UPDATE_COLUMNS},
+            "updated_at": utc_now(),
+        },
+    ).returning(Place)
+
+
+# Built once at import so SQLAlchemy's compiled cache serves every call;
+# created_at / updated_at come from the column server defaults.
+_CREATE_STAGING_SQL = text(
+    f"CREATE TEMP TABLE IF NOT EXISTS places_staging ON COMMIT DROP AS "
+    f"SELECT {', '.join(_UPSERT_COLUMNS)} FROM places WITH NO DATA"
+)
+_staging = table("places_staging", *(column(c) for c in _UPSERT_COLUMNS))
+_COPY_UPSERT_STMT = _upsert_on_conflict(
+    pg_insert(Place).from_select(
+        list(_UPSERT_COLUMNS),
+        # DISTINCT ON guards against ON CONFLICT touching one row twice
+        select(*_staging.c).distinct(_staging.c.place_id),
+    )
+)
+# Executed with a list of row dicts: batched as insertmanyvalues
+_VALUES_UPSERT_STMT = _upsert_on_conflict(pg_insert(Place))
+# RETURNING rows overwrite any stale copy already in the session
+_RETURNING_OPTIONS = {"populate_existing": True}
+
+
+async def _copy_upsert(db: AsyncSession, rows: list[dict]) -> list[Place]:
+    """
+    Bulk path: COPY rows into a temp staging table, then upsert them into
+    `places` with a single INSERT ... SELECT ... ON CONFLICT statement.
+    """
+    await db.execute(_CREATE_STAGING_SQL)
+
+    # asyncpg's json codec (as configured by SQLAlchemy) expects text
+    records = [
+        tuple(
+            json.dumps(row[c]) if c in _JSON_COLUMNS and row[c] is not None else row[c]
+            for c in _UPSERT_COLUMNS
+        )
+        for row in rows
+    ]
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "places_staging", records=records, columns=list(_UPSERT_COLUMNS)
+    )
+
+    result = await db.execute(_COPY_UPSERT_STMT, execution_options=_RETURNING_OPTIONS)
+    return list(result.scalars())
+
+
+async def _values_upsert(db: AsyncSession, rows: list[dict]) -> list[Place]:
+    """Small-batch path: multi-row INSERT ... ON CONFLICT ... RETURNING."""
+    result = await db.execute(_VALUES_UPSERT_STMT, rows, execution_options=_RETURNING_OPTIONS)
+    return list(result.scalars())
+
+
+_PLACES_BY_PLACE_IDS_STMT = select(Place).where(
+    Place.place_id.in_(bindparam("place_ids", expanding=True))
+)
+
+
 async def upsert_places(
     db: AsyncSession,
     raw_results: list[dict],
@@ -346,105 +495,53 @@ async def upsert_places(
     client: GooglePlacesClient,
 ) -> list[Place]:
     """Normalize API results, fetch details, upsert into DB, return Place objects."""
-    places: list[Place] = []
-
+    # The raw results are Places API (New) objects; one entry per place_id
+    raw_by_id: dict[str, dict] = {}
     for raw in raw_results:
-        # The raw result is a Places API (New) object; extract place_id
         gp_id = raw.get("id", "")
-        if not gp_id:
-            continue
-
-        # Check DB-level dedup
-        existing = await db.execute(select(Place).where(Place.place_id == gp_id))
-        existing_place = existing.scalar_one_or_none()
-        if existing_place:
-            places.append(existing_place)
-            continue
-
-        # Fetch full details via Place Details (New)
-        try:
-            details_raw = await client.get_place_details(gp_id)
-        except Exception as exc:
-            logger.error(f"Failed to fetch details for {gp_id}: {exc}")
-            details_raw = raw  # Fall back to text search data
+        if gp_id and gp_id not in raw_by_id:
+            raw_by_id[gp_id] = raw
+
+    # DB-level dedup in a single round trip
+    existing: dict[str, Place] = {}
+    if raw_by_id:
+        result = await db.execute(_PLACES_BY_PLACE_IDS_STMT, {"place_ids": list(raw_by_id)})
+        existing = {p.place_id: p for p in result.scalars()}
+    missing = [gp_id for gp_id in raw_by_id if gp_id not in existing]
+
+    # Fetch full details via Place Details (New) concurrently; _rate_limiter
+    # still caps the request rate
+    details_list = await asyncio.gather(
+        *(client.get_place_details(gp_id) for gp_id in missing),
+        return_exceptions=True,
+    )
 
+    rows: dict[str, dict] = {}
+    for gp_id, details_raw in zip(missing, details_list):
+        if isinstance(details_raw, BaseException):
+            logger.error(f"Failed to fetch details for {gp_id}: {details_raw}")
+            details_raw = None
         if not details_raw:
-            details_raw = raw
+            details_raw = raw_by_id[gp_id]  # Fall back to text search data
 
         # Normalize from new API camelCase into our flat dict
         details = _normalize_place(details_raw)
-
-        place = Place(
+        details.update(
             place_id=gp_id,
-            name=details.get("name", ""),
-            formatted_address=details.get("formatted_address"),
-            latitude=details.get("latitude"),
-            longitude=details.get("longitude"),
-            rating=details.get("rating"),
-            user_ratings_total=details.get("user_ratings_total"),
-            formatted_phone_number=details.get("formatted_phone_number"),
-            website=details.get("website"),
-            opening_hours=details.get("opening_hours"),
-            address_components=details.get("address_components"),
-            types=details.get("types"),
-            business_status=details.get("business_status"),
-            price_level=details.get("price_level"),
             search_query=search_query,
             search_location=search_location,
         )
+        rows[gp_id] = {c: details.get(c) for c in _UPSERT_COLUMNS}
 
-        # Upsert via INSERT … ON CONFLICT
-        stmt = pg_insert(Place).values(
-            place_id=place.place_id,
-            name=place.name,
-            formatted_address=place.formatted_address,
-            latitude=place.latitude,
-            longitude=place.longitude,
-            rating=place.rating,
-            user_ratings_total=place.user_ratings_total,
-            formatted_phone_number=place.formatted_phone_number,
-            website=place.website,
-            opening_hours=place.opening_hours,
-            address_components=place.address_components,
-            types=place.types,
-            business_status=place.business_status,
-            price_level=place.price_level,
-            search_query=place.search_query,
-            search_location=place.search_location,
-            created_at=datetime.datetime.utcnow(),
-            updated_at=datetime.datetime.utcnow(),
-        ).on_conflict_do_update(
-            index_elements=["place_id"],
-            set_={
-                "name": place.name,
-                "formatted_address": place.formatted_address,
-                "latitude": place.latitude,
-                "longitude": place.longitude,
-                "rating": place.rating,
-                "user_ratings_total": place.user_ratings_total,
-                "formatted_phone_number": place.formatted_phone_number,
-                "website": place.website,
-                "opening_hours": place.opening_hours,
-                "address_components": place.address_components,
-                "types": place.types,
-                "business_status": place.business_status,
-                "price_level": place.price_level,
-                "updated_at": datetime.datetime.utcnow(),
-            },
-        ).returning(Place.id)
-
-        result = await db.execute(stmt)
-        place_id_db = result.scalar_one()
-        place.id = place_id_db
-        places.append(place)
+    # RETURNING hands back fully loaded Place objects; no re-fetch needed
+    upserted: list[Place] = []
+    if len(rows) >= COPY_THRESHOLD:
+        logger.info(f"Upserting {len(rows)} places via COPY")
+        upserted = await _copy_upsert(db, list(rows.values()))
+    elif rows:
+        upserted = await _values_upsert(db, list(rows.values()))
 
     await db.commit()
 
-    # Re-fetch all places from DB to get fully hydrated objects
-    if places:
-        ids = [p.id for p in places]
-        stmt = select(Place).where(Place.id.in_(ids))
-        result = await db.execute(stmt)
-        places = list(result.scalars().all())
-
-    return places
+    by_id = {**existing, **{p.place_id: p for p in upserted}}
+    return [by_id[gp_id] for gp_id in raw_by_id if gp_id in by_id]
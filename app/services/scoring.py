@@ -7,15 +7,38 @@ Weights can be adjusted depending on the use case.
 
 from __future__ import annotations
 
-import datetime
 import math
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, update
+from sqlalchemy import select, func, and_, any_, literal, update, values, column, Integer, Float
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.logging_config import logger
-from app.db.models import Place, LocationScore
+from app.db.models import Place, LocationScore, utc_now
+
+
+# Everything score_batch / _competition_counts read from a place
+SCORING_COLUMNS = (
+    Place.id,
+    Place.name,
+    Place.latitude,
+    Place.longitude,
+    Place.rating,
+    Place.user_ratings_total,
+    Place.website,
+    Place.formatted_phone_number,
+    Place.opening_hours,
+    Place.formatted_address,
+)
+
+# Rows per _save_scores statement: the upsert binds 6 parameters a row, which
+# keeps each statement well under asyncpg's 32767-parameter limit
+SAVE_CHUNK_SIZE = 4000
 
 
 class ScoringEngine:
@@ -39,6 +62,8 @@ class ScoringEngine:
         "accessibility": 0.20,
         "rating": 0.25,
     }
+    # Checked once at import (stripped under -O) rather than by a test
+    assert abs(sum(WEIGHTS.values()) - 1.0) < 1e-3, WEIGHTS
 
     # ── Sub-score calculations ───────────────────────────────────
 
@@ -83,31 +108,43 @@ class ScoringEngine:
             score += 0.20
         return round(score, 4)
 
-    async def _competition_score(
-        self, db: AsyncSession, place: Place, radius_km: float = 2.0
-    ) -> float:
+    @staticmethod
+    async def _competition_counts(
+        db: AsyncSession, places: Sequence, radius_km: float = 2.0
+    ) -> dict[int, int]:
         """
-        Inverse density: fewer competitors nearby → higher score.
-        Measures how "uncrowded" a location is.
+        Number of other places within radius_km of each place, for the whole
+        batch in one ST_DWithin self-join (served by ix_places_geom).
+        Places without coordinates are left out.
         """
-        if place.latitude is None or place.longitude is None:
-            return 0.5  # neutral if no coordinates
-
-        lat = place.latitude
-        lng = place.longitude
-        lat_delta = radius_km / 111.0
-        lng_delta = radius_km / (111.0 * max(0.01, math.cos(math.radians(lat))))
+        ids = [p.id for p in places if p.latitude is not None and p.longitude is not None]
+        if not ids:
+            return {}
 
+        target = aliased(Place)
         result = await db.execute(
-            select(func.count(Place.id)).where(
+            select(target.id, func.count(Place.id))
+            .outerjoin(
+                Place,
                 and_(
-                    Place.latitude.between(lat - lat_delta, lat + lat_delta),
-                    Place.longitude.between(lng - lng_delta, lng + lng_delta),
-                    Place.id != place.id,
-                )
+                    func.ST_DWithin(Place.geom, target.geom, radius_km * 1000),
+                    Place.id != target.id,
+                ),
             )
+            # One array parameter rather than an IN list of len(ids) binds
+            .where(target.id == any_(literal(ids, ARRAY(Integer))))
+            .group_by(target.id)
         )
-        nearby_count = result.scalar() or 0
+        return dict(result.all())
+
+    @staticmethod
+    def _competition_score(nearby_count: Optional[int]) -> float:
+        """
+        Inverse density: fewer competitors nearby → higher score.
+        Measures how "uncrowded" a location is.
+        """
+        if nearby_count is None:
+            return 0.5  # neutral if no coordinates
 
         # Sigmoid-like inverse: 0 competitors → 1.0, many → approaches 0
         if nearby_count == 0:
@@ -117,87 +154,157 @@ class ScoringEngine:
 
     # ── Composite score ──────────────────────────────────────────
 
-    async def score_place(
-        self, db: AsyncSession, place: Place
-    ) -> LocationScore:
-        """Compute and persist location score for a single place."""
-        demand = self._demand_score(place)
-        rating = self._rating_score(place)
-        accessibility = self._accessibility_score(place)
-        competition = await self._competition_score(db, place)
+    def score_batch(
+        self, places: Sequence, competition_counts: dict[int, int]
+    ) -> dict[str, np.ndarray]:
+        """
+        Vectorized equivalent of the per-place sub-scores above: one pass of
+        array math for the whole batch, keyed by LocationScore column.
+        """
+        n = len(places)
+        reviews = np.fromiter((max(p.user_ratings_total or 0, 0) for p in places), np.float64, n)
+        ratings = np.fromiter((p.rating or 0.0 for p in places), np.float64, n)
+        has_site = np.fromiter((bool(p.website) for p in places), bool, n)
+        has_phone = np.fromiter((bool(p.formatted_phone_number) for p in places), bool, n)
+        has_hours = np.fromiter((bool(p.opening_hours) for p in places), bool, n)
+        has_addr = np.fromiter((bool(p.formatted_address) for p in places), bool, n)
+        # -1 marks "no coordinates" → neutral competition score
+        nearby = np.fromiter((competition_counts.get(p.id, -1) for p in places), np.float64, n)
 
-        composite = (
+        demand = np.round(np.minimum(1.0, np.log10(reviews + 1) / 4.0), 4)
+        rating = np.round(np.where(ratings >= 1, np.minimum(1.0, (ratings - 1.0) / 4.0), 0.0), 4)
+        accessibility = np.round(
+            0.30 * has_site + 0.25 * has_phone + 0.25 * has_hours + 0.20 * has_addr, 4
+        )
+        competition = np.where(
+            nearby < 0,
+            0.5,
+            np.round(np.clip(1.0 / (1.0 + np.log(np.maximum(nearby, 0) + 1)), 0.0, 1.0), 4),
+        )
+        composite = np.round(
             demand * self.WEIGHTS["demand"]
             + competition * self.WEIGHTS["competition"]
             + accessibility * self.WEIGHTS["accessibility"]
-            + rating * self.WEIGHTS["rating"]
+            + rating * self.WEIGHTS["rating"],
+            4,
         )
-        composite = round(composite, 4)
+        return {
+            "demand_score": demand,
+            "competition_score": competition,
+            "accessibility_score": accessibility,
+            "rating_score": rating,
+            "composite_score": composite,
+        }
 
-        # Upsert location score
-        existing = await db.execute(
-            select(LocationScore).where(LocationScore.place_id == place.id)
-        )
-        score_obj = existing.scalar_one_or_none()
-
-        if score_obj:
-            score_obj.demand_score = demand
-            score_obj.competition_score = competition
-            score_obj.accessibility_score = accessibility
-            score_obj.rating_score = rating
-            score_obj.composite_score = composite
-            score_obj.computed_at = datetime.datetime.utcnow()
-        else:
-            score_obj = LocationScore(
-                place_id=place.id,
-                demand_score=demand,
-                competition_score=competition,
-                accessibility_score=accessibility,
-                rating_score=rating,
-                composite_score=composite,
+    async def _save_scores(
+        self, db: AsyncSession, places: Sequence, batch: dict[str, np.ndarray]
+    ) -> list[LocationScore]:
+        """
+        Persist a scored batch with two set-based statements per chunk: a
+        multi-row upsert into location_scores and an UPDATE ... FROM
+        (VALUES ...) for places.location_score.
+
+        places: Place instances or column-only rows (anything with .id).
+        """
+        columns = {key: arr.tolist() for key, arr in batch.items()}
+        rows = [
+            {"place_id": place.id, **{key: columns[key][i] for key in columns}}
+            for i, place in enumerate(places)
+        ]
+        composites = list(zip((place.id for place in places), columns["composite_score"]))
+
+        by_place = {}
+        # Both statements inline every row as bind parameters, so large
+        # batches are written SAVE_CHUNK_SIZE rows at a time
+        for start in range(0, len(rows), SAVE_CHUNK_SIZE):
+            stmt = pg_insert(LocationScore).values(rows[start:start + SAVE_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["place_id"],
+                set_={
+                    **{key: stmt.excluded[key] for key in columns},
+                    "computed_at": utc_now(),
+                },
+            ).returning(LocationScore)
+            result = await db.execute(stmt, execution_options={"populate_existing": True})
+            by_place.update((score.place_id, score) for score in result.scalars())
+
+            # Also persist on the place itself for quick access
+            batch_values = values(
+                column("id", Integer), column("score", Float), name="v"
+            ).data(composites[start:start + SAVE_CHUNK_SIZE])
+            await db.execute(
+                update(Place)
+                .where(Place.id == batch_values.c.id)
+                .values(location_score=batch_values.c.score)
+                .execution_options(synchronize_session=False)
             )
-            db.add(score_obj)
 
-        # Also persist on the place itself for quick access
-        await db.execute(
-            update(Place)
-            .where(Place.id == place.id)
-            .values(location_score=composite)
-        )
+        for place, (_, composite) in zip(places, composites):
+            if isinstance(place, Place):
+                # Written by the bulk UPDATE above; keep the ORM from re-flushing it
+                set_committed_value(place, "location_score", composite)
 
-        logger.debug(
-            f"Scored {place.name}: demand={demand} comp={competition} "
-            f"access={accessibility} rating={rating} → {composite}"
-        )
-        return score_obj
+        logger.debug(f"Scored {len(places)} places")
+        return [by_place[place.id] for place in places]
+
+    async def score_place(
+        self,
+        db: AsyncSession,
+        place: Place,
+        competition_counts: Optional[dict[int, int]] = None,
+    ) -> LocationScore:
+        """
+        Compute and persist location score for a single place.
+
+        competition_counts: precomputed _competition_counts() for a batch
+        containing this place; queried on demand when omitted.
+        """
+        if competition_counts is None:
+            competition_counts = await self._competition_counts(db, [place])
+        batch = self.score_batch([place], competition_counts)
+        return (await self._save_scores(db, [place], batch))[0]
 
     async def score_places(
-        self, db: AsyncSession, places: list[Place]
+        self, db: AsyncSession, places: Sequence
     ) -> list[LocationScore]:
-        """Score a batch of places."""
-        scores = []
-        for place in places:
-            score = await self.score_place(db, place)
-            scores.append(score)
+        """Score a batch of places (Place instances or SCORING_COLUMNS rows)."""
+        if not places:
+            return []
+        competition_counts = await self._competition_counts(db, places)
+        batch = self.score_batch(places, competition_counts)
+        scores = await self._save_scores(db, places, batch)
         await db.commit()
         return scores
 
     async def score_all_unscored(self, db: AsyncSession) -> int:
         """Score all places that don't have a location_score."""
+        # Plain column rows: scoring only reads these, no ORM objects needed
         result = await db.execute(
-            select(Place).where(Place.location_score.is_(None))
+            select(*SCORING_COLUMNS).where(Place.location_score.is_(None))
         )
-        places = list(result.scalars().all())
-        if places:
-            await self.score_places(db, places)
-        return len(places)
+        rows = result.all()
+        if rows:
+            await self.score_places(db, rows)
+        return len(rows)
 
     async def get_top_locations(
         self, db: AsyncSession, limit: int = 20, category: Optional[str] = None
     ) -> list[dict]:
         """Return top-scored locations, optionally filtered by search category."""
         query = (
-            select(Place, LocationScore)
+            select(
+                Place.id,
+                Place.name,
+                Place.formatted_address,
+                Place.latitude,
+                Place.longitude,
+                Place.classification,
+                LocationScore.composite_score,
+                LocationScore.demand_score,
+                LocationScore.competition_score,
+                LocationScore.accessibility_score,
+                LocationScore.rating_score,
+            )
             .join(LocationScore, LocationScore.place_id == Place.id)
             .order_by(LocationScore.composite_score.desc())
             .limit(limit)
@@ -206,21 +313,20 @@ class ScoringEngine:
             query = query.where(Place.search_query.ilike(f"%{category}%"))
 
         result = await db.execute(query)
-        rows = result.all()
 
         return [
             {
-                "place_id": place.id,
-                "name": place.name,
-                "address": place.formatted_address,
-                "lat": place.latitude,
-                "lng": place.longitude,
-                "classification": place.classification,
-                "composite_score": score.composite_score,
-                "demand_score": score.demand_score,
-                "competition_score": score.competition_score,
-                "accessibility_score": score.accessibility_score,
-                "rating_score": score.rating_score,
+                "place_id": row.id,
+                "name": row.name,
+                "address": row.formatted_address,
+                "lat": row.latitude,
+                "lng": row.longitude,
+                "classification": row.classification,
+                "composite_score": row.composite_score,
+                "demand_score": row.demand_score,
+                "competition_score": row.competition_score,
+                "accessibility_score": row.accessibility_score,
+                "rating_score": row.rating_score,
             }
-            for place, score in rows
+            for row in result
         ]
@@ -0,0 +1,17 @@
+"""Lightweight stand-ins for ORM objects in unit tests."""
+
+
+class FakePlace:
+    """Attribute-only Place: just the fields the classifier and scoring read."""
+
+    __slots__ = (
+        "id", "name", "user_ratings_total", "website", "price_level", "types",
+        "formatted_address", "rating", "formatted_phone_number", "opening_hours",
+        "latitude", "longitude",
+    )
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.pop(field, None))
+        if kwargs:
+            raise TypeError(f"FakePlace has no field(s): {', '.join(kwargs)}")
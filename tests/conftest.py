@@ -2,20 +2,14 @@
 Test configuration and shared fixtures.
 """
 
-import asyncio
-import pytest
-import pytest_asyncio
-from unittest.mock import AsyncMock, patch, MagicMock
-
-# Override settings before any app imports
 import os
-os.environ["GOOGLE_PLACES_API_KEY"] = "test-key-for-testing"
-os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///test.db"
-os.environ["DATABASE_URL_SYNC"] = "sqlite:///test.db"
 
 
-@pytest.fixture(scope="session")
-def event_loop():
-    loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+def pytest_configure(config):
+    """Override settings before any test module (and so any app module) is imported."""
+    os.environ["GOOGLE_PLACES_API_KEY"] = "test-key-for-testing"
+    # Shared-cache in-memory SQLite unless a database is given (the
+    # integration tests need a real PostgreSQL one): nothing touches the disk,
+    # and each xdist worker is its own process so it gets its own database
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared&uri=true")
+    os.environ.setdefault("DATABASE_URL_SYNC", "sqlite:///file::memory:?cache=shared&uri=true")
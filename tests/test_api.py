@@ -1,63 +1,75 @@
 """
-Integration tests for FastAPI endpoints using TestClient.
+Integration tests for FastAPI endpoints using httpx's ASGI transport.
 Uses mocked Google API responses — no real API calls.
 Migrated to Places API (New) response format.
 """
 
+import asyncio
+
+import httpx
 import pytest
-from unittest.mock import patch, AsyncMock, MagicMock
+import pytest_asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+# Requests go straight into the app on the test's own event loop (no
+# TestClient thread portal); the session-scoped client needs a session loop.
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+# Stand-in for the request-scoped DB session; routes that reach it get mocks
+_FAKE_SESSION = AsyncMock()
+
 
-import os
-os.environ["GOOGLE_PLACES_API_KEY"] = "test-key"
-os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///test.db"
-os.environ["DATABASE_URL_SYNC"] = "sqlite:///test.db"
+async def _fake_get_db():
+    yield _FAKE_SESSION
 
-from fastapi.testclient import TestClient
+
+# One client serves the whole session. The app's lifespan (init_db, the
+# enrichment workers, client/engine shutdown) is deliberately not run, and
+# get_db is overridden, so no engine or init_db patching is needed; tests
+# that need different behaviour patch the route-level singletons themselves.
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client():
+    """Create test client with the DB session dependency overridden."""
+    from app.main import app
+    from app.db.session import get_db
+
+    app.dependency_overrides[get_db] = _fake_get_db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.pop(get_db, None)
 
 
-# We need to patch the DB before importing the app
 @pytest.fixture
-def client():
-    """Create test client with mocked database."""
-    with patch("app.db.session.init_db", new_callable=AsyncMock):
-        with patch("app.db.session.engine") as mock_engine:
-            mock_engine.dispose = AsyncMock()
-            # Use a mock for connect
-            mock_conn = AsyncMock()
-            mock_conn.__aenter__ = AsyncMock(return_value=mock_conn)
-            mock_conn.__aexit__ = AsyncMock(return_value=None)
-            mock_conn.execute = AsyncMock()
-            mock_engine.connect = MagicMock(return_value=mock_conn)
-
-            from app.main import app
-            with TestClient(app) as c:
-                yield c
+def patched_search(monkeypatch):
+    """Stub the route-level Places client and upsert; text_search returns no results."""
+    mock_client = SimpleNamespace(text_search=AsyncMock(return_value=[]), close=AsyncMock())
+    monkeypatch.setattr("app.api.routes._places_client", mock_client)
+    monkeypatch.setattr("app.api.routes.upsert_places", AsyncMock(return_value=[]))
+    return mock_client
 
 
 class TestHealthEndpoint:
-    def test_health_returns_200(self, client):
-        resp = client.get("/health")
+    async def test_health_returns_200(self, client):
+        resp = await client.get("/health")
         assert resp.status_code == 200
         data = resp.json()
         assert data["status"] == "healthy"
         assert data["version"] == "1.0.0"
         assert "database" in data
 
-    def test_root_returns_html_or_json(self, client):
-        resp = client.get("/")
+    async def test_root_returns_html_or_json(self, client):
+        resp = await client.get("/")
         assert resp.status_code == 200
 
 
 class TestSearchEndpoint:
-    @patch("app.api.routes._places_client")
-    @patch("app.api.routes.upsert_places")
-    def test_search_empty_results(self, mock_upsert, mock_client, client):
+    async def test_search_empty_results(self, patched_search, client):
         """Search with no results should return empty list (Places API New format)."""
         # Places API (New) returns empty list when no results
-        mock_client.text_search = AsyncMock(return_value=[])
-        mock_client.close = AsyncMock()
-
-        resp = client.post("/api/v1/search", json={
+        resp = await client.post("/api/v1/search", json={
             "query": "nonexistent place xyz",
             "max_pages": 1,
             "enrich": False,
@@ -66,114 +78,120 @@ class TestSearchEndpoint:
         data = resp.json()
         assert data["total_results"] == 0
         assert data["places"] == []
+        patched_search.text_search.assert_awaited_once()
 
-    def test_search_missing_query(self, client):
+    async def test_search_missing_query(self, client):
         """Search without query should return 422."""
-        resp = client.post("/api/v1/search", json={})
+        resp = await client.post("/api/v1/search", json={})
+        assert resp.status_code == 422
+
+
+class TestSSEPayload:
+    async def test_place_timestamps_match_json_endpoints(self):
+        import datetime
+        import orjson
+        from app.api.routes import _PLACE_LIST, _sse_event
+        from app.db.models import Place
+        from app.schemas import PlaceOut
+
+        place = Place(id=1, place_id="p1", name="Cafe", created_at=datetime.datetime(2026, 1, 2, 3, 4, 5))
+        place.emails, place.enrichment = [], None
+        out = PlaceOut.from_orm_trusted(place)
+
+        event = _sse_event("result", {"places": _PLACE_LIST.dump_python([out], mode="json")})
+        sse_place = orjson.loads(event.split(b"data: ", 1)[1])["places"][0]
+        assert sse_place == orjson.loads(out.model_dump_json())
+        assert sse_place["created_at"] == "2026-01-02T03:04:05"
+
+
+class TestHeatmapEndpoint:
+    async def test_inverted_bbox_is_rejected(self, client):
+        resp = await client.post("/api/v1/heatmap", json={
+            "category": "cafe",
+            "lat_min": 25.3, "lat_max": 25.0,
+            "lng_min": 55.0, "lng_max": 55.3,
+        })
         assert resp.status_code == 422
 
 
+@pytest.fixture
+def real_db():
+    """Serve this test from the configured database instead of the fake session."""
+    from app.main import app
+    from app.db.session import get_db
+
+    override = app.dependency_overrides.pop(get_db)
+    yield
+    app.dependency_overrides[get_db] = override
+
+
+@pytest.mark.integration
+@pytest.mark.usefixtures("real_db")
 class TestPlacesEndpoints:
-    @pytest.mark.skipif(
-        os.environ.get("DATABASE_URL", "").startswith("sqlite"),
-        reason="Requires PostgreSQL with tables"
-    )
-    def test_places_list_endpoint_exists(self, client):
+    async def test_places_list_endpoint_exists(self, client):
         """Places list endpoint should be reachable."""
-        # This will fail on DB but should not 404
-        resp = client.get("/api/v1/places")
-        # Either 200 (if mocked) or 500 (DB error), but not 404
-        assert resp.status_code != 404
-
-    @pytest.mark.skipif(
-        os.environ.get("DATABASE_URL", "").startswith("sqlite"),
-        reason="Requires PostgreSQL with tables"
-    )
-    def test_place_detail_not_found(self, client):
-        """Requesting non-existent place should handle gracefully."""
-        resp = client.get("/api/v1/places/99999")
-        # Either 404 or 500, but endpoint exists
-        assert resp.status_code in (404, 500)
+        resp = await client.get("/api/v1/places")
+        assert resp.status_code == 200
+        assert isinstance(resp.json(), list)
+
+    async def test_place_detail_not_found(self, client):
+        """Requesting non-existent place should return 404."""
+        resp = await client.get("/api/v1/places/99999999")
+        assert resp.status_code == 404
+
+
+class TestCsvExportStream:
+    async def test_disconnect_mid_copy_releases_connection(self, monkeypatch):
+        """A client leaving while the chunk queue is full must not strand the COPY."""
+        from app.api import routes
+        from app.db import session
+
+        copy_finished = asyncio.Event()
+
+        async def copy_from_query(sql, *args, output, **kwargs):
+            try:
+                for i in range(100):  # far more than the queue holds
+                    await output(b"row%d\n" % i)
+            finally:
+                copy_finished.set()
+
+        raw = SimpleNamespace(driver_connection=SimpleNamespace(copy_from_query=copy_from_query))
+        released = []
+
+        class FakeConnection:
+            async def __aenter__(self):
+                return SimpleNamespace(get_raw_connection=AsyncMock(return_value=raw))
+
+            async def __aexit__(self, *exc):
+                released.append(copy_finished.is_set())
+
+        monkeypatch.setattr(session, "engine", SimpleNamespace(connect=FakeConnection))
+
+        stream = routes._stream_copy_csv("SELECT 1", [])
+        assert await stream.__anext__() == b"\xef\xbb\xbf"
+        assert await stream.__anext__() == b"row0\n"
+        await asyncio.sleep(0)  # let the COPY fill the queue
+        await asyncio.wait_for(stream.aclose(), timeout=1)
+
+        # The COPY was stopped before the connection went back to the pool
+        assert released == [True]
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def openapi_json(client):
+    """The OpenAPI schema, fetched once per session."""
+    resp = await client.get("/openapi.json")
+    assert resp.status_code == 200
+    return resp.json()
 
 
 class TestAPIDocumentation:
-    def test_openapi_schema_accessible(self, client):
-        resp = client.get("/openapi.json")
-        assert resp.status_code == 200
-        schema = resp.json()
-        assert schema["info"]["title"] == "Google Places Data Ingestion & Enrichment Service"
-        assert schema["info"]["version"] == "1.0.0"
+    async def test_openapi_schema_accessible(self, openapi_json):
+        assert openapi_json["info"]["title"] == "Google Places Data Ingestion & Enrichment Service"
+        assert openapi_json["info"]["version"] == "1.0.0"
 
-    def test_docs_endpoint(self, client):
-        resp = client.get("/docs")
+    async def test_docs_endpoint(self, client):
+        # Only the status matters; skip the HTML body
+        resp = await client.head("/docs")
         assert resp.status_code == 200
 
-
-class TestPlacesAPINewFormat:
-    """Tests to validate the Places API (New) integration."""
-
-    def test_normalize_place_function(self):
-        """Test that the _normalize_place helper correctly maps new API fields."""
-        from app.services.places_client import _normalize_place
-
-        raw = {
-            "id": "ChIJN1t_tDeuEmsRUsoyG83frY4",
-            "displayName": {"text": "Google HQ", "languageCode": "en"},
-            "formattedAddress": "1600 Amphitheatre Pkwy, Mountain View, CA",
-            "location": {"latitude": 37.4220, "longitude": -122.0841},
-            "rating": 4.5,
-            "userRatingCount": 12345,
-            "nationalPhoneNumber": "(650) 253-0000",
-            "websiteUri": "https://google.com",
-            "regularOpeningHours": {
-                "openNow": True,
-                "weekdayDescriptions": ["Monday: 9AM–5PM"],
-            },
-            "types": ["point_of_interest", "establishment"],
-            "businessStatus": "OPERATIONAL",
-            "priceLevel": "PRICE_LEVEL_MODERATE",
-        }
-
-        result = _normalize_place(raw)
-
-        assert result["place_id"] == "ChIJN1t_tDeuEmsRUsoyG83frY4"
-        assert result["name"] == "Google HQ"
-        assert result["formatted_address"] == "1600 Amphitheatre Pkwy, Mountain View, CA"
-        assert result["latitude"] == 37.4220
-        assert result["longitude"] == -122.0841
-        assert result["rating"] == 4.5
-        assert result["user_ratings_total"] == 12345
-        assert result["formatted_phone_number"] == "(650) 253-0000"
-        assert result["website"] == "https://google.com"
-        assert result["opening_hours"]["open_now"] is True
-        assert "Monday: 9AM–5PM" in result["opening_hours"]["weekday_text"]
-        assert "establishment" in result["types"]
-        assert result["business_status"] == "OPERATIONAL"
-        assert result["price_level"] == 2  # MODERATE → 2
-
-    def test_normalize_place_minimal(self):
-        """Normalize a minimal place object (missing optional fields)."""
-        from app.services.places_client import _normalize_place
-
-        raw = {
-            "id": "ChIJabc123",
-            "displayName": {"text": "Tiny Shop"},
-        }
-
-        result = _normalize_place(raw)
-
-        assert result["place_id"] == "ChIJabc123"
-        assert result["name"] == "Tiny Shop"
-        assert result["rating"] is None
-        assert result["price_level"] is None
-        assert result["opening_hours"] is None
-
-    def test_price_level_mapping(self):
-        """All price level strings should map to correct integers."""
-        from app.services.places_client import _PRICE_LEVEL_MAP
-
-        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_FREE"] == 0
-        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_INEXPENSIVE"] == 1
-        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_MODERATE"] == 2
-        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_EXPENSIVE"] == 3
-        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_VERY_EXPENSIVE"] == 4
@@ -0,0 +1,70 @@
+"""
+Unit tests for mapping Places API (New) payloads onto our model fields.
+Pure functions only: no app startup, database or HTTP client involved.
+"""
+
+from app.services.places_client import _normalize_place, _PRICE_LEVEL_MAP
+
+
+class TestPlacesAPINewFormat:
+    """Tests to validate the Places API (New) integration."""
+
+    def test_normalize_place_function(self):
+        """Test that the _normalize_place helper correctly maps new API fields."""
+        raw = {
+            "id": "ChIJN1t_tDeuEmsRUsoyG83frY4",
+            "displayName": {"text": "Google HQ", "languageCode": "en"},
+            "formattedAddress": "1600 Amphitheatre Pkwy, Mountain View, CA",
+            "location": {"latitude": 37.4220, "longitude": -122.0841},
+            "rating": 4.5,
+            "userRatingCount": 12345,
+            "nationalPhoneNumber": "(650) 253-0000",
+            "websiteUri": "https://google.com",
+            "regularOpeningHours": {
+                "openNow": True,
+                "weekdayDescriptions": ["Monday: 9AM–5PM"],
+            },
+            "types": ["point_of_interest", "establishment"],
+            "businessStatus": "OPERATIONAL",
+            "priceLevel": "PRICE_LEVEL_MODERATE",
+        }
+
+        result = _normalize_place(raw)
+
+        assert result["place_id"] == "ChIJN1t_tDeuEmsRUsoyG83frY4"
+        assert result["name"] == "Google HQ"
+        assert result["formatted_address"] == "1600 Amphitheatre Pkwy, Mountain View, CA"
+        assert result["latitude"] == 37.4220
+        assert result["longitude"] == -122.0841
+        assert result["rating"] == 4.5
+        assert result["user_ratings_total"] == 12345
+        assert result["formatted_phone_number"] == "(650) 253-0000"
+        assert result["website"] == "https://google.com"
+        assert result["opening_hours"]["open_now"] is True
+        assert "Monday: 9AM–5PM" in result["opening_hours"]["weekday_text"]
+        assert "establishment" in result["types"]
+        assert result["business_status"] == "OPERATIONAL"
+        assert result["price_level"] == 2  # MODERATE → 2
+
+    def test_normalize_place_minimal(self):
+        """Normalize a minimal place object (missing optional fields)."""
+        raw = {
+            "id": "ChIJabc123",
+            "displayName": {"text": "Tiny Shop"},
+        }
+
+        result = _normalize_place(raw)
+
+        assert result["place_id"] == "ChIJabc123"
+        assert result["name"] == "Tiny Shop"
+        assert result["rating"] is None
+        assert result["price_level"] is None
+        assert result["opening_hours"] is None
+
+    def test_price_level_mapping(self):
+        """All price level strings should map to correct integers."""
+        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_FREE"] == 0
+        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_INEXPENSIVE"] == 1
+        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_MODERATE"] == 2
+        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_EXPENSIVE"] == 3
+        assert _PRICE_LEVEL_MAP["PRICE_LEVEL_VERY_EXPENSIVE"] == 4
@@ -3,56 +3,62 @@ Unit tests for the classifier, scoring engine, and enrichment services.
 These tests don't require a database or API key.
 """
 
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
 import pytest
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
-# Set test env before app imports
-import os
-os.environ["GOOGLE_PLACES_API_KEY"] = "test-key"
-os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///test.db"
-os.environ["DATABASE_URL_SYNC"] = "sqlite:///test.db"
+from selectolax.lexbor import LexborHTMLParser
 
-from app.services.classifier import BusinessClassifier
-from app.services.enrichment import WebsiteEnricher
+from tests._fakes import FakePlace
 
 
 # ── Classifier Tests ─────────────────────────────────────────────
 
+# Services are imported inside fixtures so an xdist worker only pays for the
+# modules its share of the tests needs. Engines are stateless; tests that stub
+# a method use monkeypatch so the change is undone before the next test.
+@pytest.fixture(scope="class")
+def classifier():
+    from app.services.classifier import BusinessClassifier
+    return BusinessClassifier()
+
+
+@pytest.fixture(scope="class")
+def scoring_engine():
+    from app.services.scoring import ScoringEngine
+    return ScoringEngine()
+
+
 class TestBusinessClassifier:
-    def setup_method(self):
-        self.classifier = BusinessClassifier()
+    _DEFAULTS = {"id": 1, "name": "Test Place", "types": (), "formatted_address": "123 Test St"}
 
     def _make_place(self, **kwargs):
-        place = MagicMock()
-        place.name = kwargs.get("name", "Test Place")
-        place.user_ratings_total = kwargs.get("user_ratings_total", None)
-        place.website = kwargs.get("website", None)
-        place.price_level = kwargs.get("price_level", None)
-        place.types = kwargs.get("types", [])
-        place.formatted_address = kwargs.get("formatted_address", "123 Test St")
-        return place
-
-    def test_known_brand_detected(self):
+        return FakePlace(**{**self._DEFAULTS, **kwargs})
+
+    def test_known_brand_detected(self, classifier):
         """Known brands should be classified as 'brand'."""
         place = self._make_place(
             name="McDonald's Dubai Marina",
             user_ratings_total=5000,
             website="https://mcdonalds.com",
         )
-        classification, confidence = self.classifier.classify(place)
+        classification, confidence = classifier.classify(place)
         assert classification == "brand"
         assert confidence > 0.4
 
-    def test_starbucks_is_brand(self):
+    def test_starbucks_is_brand(self, classifier):
         place = self._make_place(
             name="Starbucks - City Walk",
             user_ratings_total=2000,
             website="https://starbucks.com",
         )
-        classification, _ = self.classifier.classify(place)
+        classification, _ = classifier.classify(place)
         assert classification == "brand"
 
-    def test_local_shop_detected(self):
+    def test_local_shop_detected(self, classifier):
         """Small local shop should be classified as 'local'."""
         place = self._make_place(
             name="Ahmed's Shawarma Corner",
@@ -60,173 +66,569 @@ class TestBusinessClassifier:
             website=None,
             types=["cafe"],
         )
-        classification, confidence = self.classifier.classify(place)
+        classification, confidence = classifier.classify(place)
         assert classification == "local"
 
-    def test_no_data_defaults_local(self):
+    def test_no_data_defaults_local(self, classifier):
         """Place with minimal data should default to local."""
         place = self._make_place(name="Unknown Place")
-        classification, _ = self.classifier.classify(place)
+        classification, _ = classifier.classify(place)
         assert classification == "local"
 
-    def test_high_review_count_boosts_brand_score(self):
+    def test_high_review_count_boosts_brand_score(self, classifier):
         """High review count should push toward brand classification."""
         place = self._make_place(
             name="Generic Restaurant",
             user_ratings_total=5000,
             website="https://genericrestaurant.com",
         )
-        _, confidence_high = self.classifier.classify(place)
+        _, confidence_high = classifier.classify(place)
 
         place_low = self._make_place(
             name="Generic Restaurant",
             user_ratings_total=5,
         )
-        _, confidence_low = self.classifier.classify(place_low)
+        _, confidence_low = classifier.classify(place_low)
 
         assert confidence_high > confidence_low
 
-    def test_chain_pattern_detection(self):
+    def test_chain_pattern_detection(self, classifier):
         """Franchise/chain patterns in name should be detected."""
         place = self._make_place(
             name="Pizza Place - Branch #3",
             user_ratings_total=200,
         )
-        classification, confidence = self.classifier.classify(place)
+        classification, confidence = classifier.classify(place)
         # Chain pattern should boost brand score
         assert confidence > 0.2
 
-    def test_classify_returns_valid_range(self):
+    @pytest.mark.parametrize("place_kwargs", [
+        {"name": "Test"},
+        {"name": "McDonald's", "user_ratings_total": 99999},
+        {"name": "x", "types": ["cafe"]},
+    ])
+    def test_classify_returns_valid_range(self, classifier, place_kwargs):
         """Confidence should always be between 0 and 1."""
-        test_cases = [
-            self._make_place(name="Test"),
-            self._make_place(name="McDonald's", user_ratings_total=99999),
-            self._make_place(name="x", types=["cafe"]),
+        _, confidence = classifier.classify(self._make_place(**place_kwargs))
+        assert 0.0 <= confidence <= 1.0
+
+    def test_classify_batch_matches_single(self, classifier):
+        places = [
+            self._make_place(name="McDonald's", user_ratings_total=5000, website="https://mcdonalds.com"),
+            self._make_place(name="Ahmed's Shawarma Corner", user_ratings_total=15, types=["cafe"]),
+            self._make_place(name="Store #12 Express Outlet", website="https://shop.ae"),
         ]
-        for place in test_cases:
-            _, confidence = self.classifier.classify(place)
-            assert 0.0 <= confidence <= 1.0
+        assert classifier.classify_batch(places) == [
+            classifier.classify(p) for p in places
+        ]
+        assert classifier.classify_batch([]) == []
+
+    async def test_classify_places_single_update(self, classifier):
+        """A batch is persisted with one UPDATE statement."""
+
+        from sqlalchemy import inspect
+        from app.db.models import Place
+
+        places = [Place(id=1, name="Starbucks"), Place(id=2, name="Corner Shop")]
+        db = AsyncMock()
+
+        await classifier.classify_places(db, places)
+        assert db.execute.await_count == 1
+        assert places[0].classification == "brand"
+        # Values are written by the bulk UPDATE only, not flushed again per row
+        assert not any(inspect(p).attrs.classification.history.has_changes() for p in places)
+
+    async def test_classify_places_chunks_large_batches(self, classifier, monkeypatch):
+        from app.db.models import Place
+        from app.services import classifier as classifier_module
+
+        places = [Place(id=i, name=f"Shop {i}") for i in range(5)]
+        db = AsyncMock()
+        monkeypatch.setattr(classifier_module, "UPDATE_CHUNK_SIZE", 2)
+
+        await classifier.classify_places(db, places)
+        assert db.execute.await_count == 3
+        db.commit.assert_awaited_once()
 
 
 # ── Email Extraction Tests ───────────────────────────────────────
 
+@pytest.fixture(scope="module")
+def enricher_cls():
+    from app.services.enrichment import WebsiteEnricher
+    return WebsiteEnricher
+
+
 class TestEmailExtraction:
-    def test_basic_email_extraction(self):
-        html = '<p>Contact us at info@restaurant.ae or sales@shop.com</p>'
-        emails = WebsiteEnricher._extract_emails(html)
+    def test_basic_email_extraction(self, enricher_cls):
+        html = b'<p>Contact us at info@restaurant.ae or sales@shop.com</p>'
+        emails = enricher_cls._extract_emails(html)
         assert "info@restaurant.ae" in emails
         assert "sales@shop.com" in emails
 
-    def test_no_emails(self):
-        html = '<p>No emails here, just text.</p>'
-        emails = WebsiteEnricher._extract_emails(html)
+    def test_no_emails(self, enricher_cls):
+        html = b'<p>No emails here, just text.</p>'
+        emails = enricher_cls._extract_emails(html)
         assert len(emails) == 0
 
-    def test_filters_image_files(self):
+    def test_filters_image_files(self, enricher_cls):
         """Should not extract image file references as emails."""
-        html = '<img src="logo@2x.png"> <a href="mailto:real@business.com">email</a>'
-        emails = WebsiteEnricher._extract_emails(html)
+        html = b'<img src="logo@2x.png"> <a href="mailto:real@business.com">email</a>'
+        emails = enricher_cls._extract_emails(html)
         assert "real@business.com" in emails
         # Should not include image-like patterns
         for email in emails:
             assert not email.endswith(".png")
 
-    def test_filters_example_domains(self):
+    def test_filters_example_domains(self, enricher_cls):
         """Should filter out example.com and similar test domains."""
-        html = '<p>user@example.com and real@mybusiness.ae</p>'
-        emails = WebsiteEnricher._extract_emails(html)
+        html = b'<p>user@example.com and real@mybusiness.ae</p>'
+        emails = enricher_cls._extract_emails(html)
         assert "real@mybusiness.ae" in emails
         assert "user@example.com" not in emails
 
-    def test_deduplication(self):
+    def test_deduplication(self, enricher_cls):
         """Same email appearing multiple times should be deduplicated."""
-        html = '<p>info@shop.com info@shop.com INFO@SHOP.COM</p>'
-        emails = WebsiteEnricher._extract_emails(html)
+        html = b'<p>info@shop.com info@shop.com INFO@SHOP.COM</p>'
+        emails = enricher_cls._extract_emails(html)
         assert len(emails) == 1
         assert "info@shop.com" in emails
 
-    def test_contact_page_detection(self):
+    def test_long_run_without_at_sign(self, enricher_cls):
+        """A long '@'-free token (inline base64 etc.) is scanned in linear time."""
+        html = b'<script>var d="' + b"A" * 200_000 + b'";</script><p>hi@shop.com</p>'
+        assert enricher_cls._extract_emails(html) == {"hi@shop.com"}
+
+    def test_contact_page_detection(self, enricher_cls):
         html = '''
         <a href="/about">About</a>
         <a href="/contact-us">Contact Us</a>
         <a href="/menu">Menu</a>
         '''
-        url = WebsiteEnricher._find_contact_page(html, "https://example.com")
+        url = enricher_cls._find_contact_page(LexborHTMLParser(html), "https://example.com")
         assert url is not None
         assert "contact" in url.lower()
 
-    def test_no_contact_page(self):
+    def test_no_contact_page(self, enricher_cls):
         html = '<a href="/menu">Menu</a><a href="/gallery">Gallery</a>'
-        url = WebsiteEnricher._find_contact_page(html, "https://example.com")
+        url = enricher_cls._find_contact_page(LexborHTMLParser(html), "https://example.com")
         assert url is None
 
-    def test_title_extraction(self):
-        html = '<html><head><title>Best Restaurant in Dubai</title></head><body></body></html>'
-        title = WebsiteEnricher._extract_title(html)
+    def test_title_extraction(self, enricher_cls):
+        html = b'<html><head><title>Best Restaurant in Dubai</title></head><body></body></html>'
+        title = enricher_cls._extract_title(html)
         assert title == "Best Restaurant in Dubai"
 
+    def test_title_extraction_unescapes_entities(self, enricher_cls):
+        html = b'<TITLE lang="en">\n  Fish &amp; Chips  </TITLE>'
+        assert enricher_cls._extract_title(html) == "Fish & Chips"
+        assert enricher_cls._extract_title(b"<p>no title</p>") is None
+
+    def test_title_extraction_uses_response_charset(self, enricher_cls):
+        html = "<title>مطعم الريف</title>".encode("windows-1256")
+        assert enricher_cls._extract_title(html, "windows-1256") == "مطعم الريف"
+        assert enricher_cls._extract_title(b"<title>Caf\xc3\xa9</title>", "no-such-codec") == "Café"
+
+
+class TestEnrichmentBatch:
+    @staticmethod
+    def _session():
+        """AsyncSession stand-in whose begin_nested() works with `async with`."""
+        db = AsyncMock()
+        db.begin_nested = MagicMock()
+        return db
+
+    async def test_hosts_crawled_concurrently_but_serial_per_host(self, enricher_cls):
+        enricher = enricher_cls()
+        active: dict[str, int] = {}
+        peak = {"total": 0, "per_host": 0}
+
+        async def fake_crawl(place, pages=None):
+            host = place.website
+            active[host] = active.get(host, 0) + 1
+            peak["per_host"] = max(peak["per_host"], active[host])
+            peak["total"] = max(peak["total"], sum(active.values()))
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+            return {"enrichment_error": None}, {}
+
+        places = []
+        for i, host in enumerate(["https://a.com", "https://a.com", "https://b.com", "https://c.com"]):
+            place = MagicMock()
+            place.id, place.website, place.name = i, host, f"p{i}"
+            places.append(place)
+
+        enricher._crawl = fake_crawl
+        enricher._save_enrichment = AsyncMock()
+        db = self._session()
+        await enricher.enrich_places_batch(db, places)
+
+        assert peak["per_host"] == 1
+        assert peak["total"] > 1
+        assert enricher._save_enrichment.await_count == 4
+        # One commit per host group
+        assert db.commit.await_count == 3
+        # Stamped by the database, not the app clock
+        assert "timezone" in str(places[0].enriched_at)
+
+    async def test_failed_save_only_loses_that_place(self, enricher_cls):
+        enricher = enricher_cls()
+        places = [
+            SimpleNamespace(id=i, name=f"p{i}", website=site, enriched_at=None)
+            for i, site in enumerate(["https://a.com", "https://a.com", "https://b.com"])
+        ]
+        enricher._crawl = AsyncMock(return_value=({"enrichment_error": None}, {}))
+        enricher._save_enrichment = AsyncMock(side_effect=[RuntimeError("boom"), None, None])
+        db = self._session()
+        await enricher.enrich_places_batch(db, places)
+
+        assert db.begin_nested.call_count == 3
+        assert places[0].enriched_at is None
+        assert places[1].enriched_at is not None and places[2].enriched_at is not None
+        assert db.commit.await_count == 2
+
+    async def test_page_memo_scoped_to_host_group(self, enricher_cls):
+        enricher = enricher_cls()
+        memos: dict[str, list[dict]] = {}
+
+        async def fake_crawl(place, pages=None):
+            memos.setdefault(place.website, []).append(pages)
+            return {"enrichment_error": None}, {}
+
+        places = [
+            SimpleNamespace(id=i, name=f"p{i}", website=site, enriched_at=None)
+            for i, site in enumerate(["https://a.com", "https://a.com", "https://b.com"])
+        ]
+        enricher._crawl = fake_crawl
+        enricher._save_enrichment = AsyncMock()
+        await enricher.enrich_places_batch(self._session(), places)
+
+        first_a, second_a = memos["https://a.com"]
+        assert first_a is second_a
+        assert memos["https://b.com"][0] is not first_a
+
+
+class TestContactPageFetch:
+    async def test_same_page_contact_link_not_refetched(self, enricher_cls):
+        enricher = enricher_cls()
+        enricher._check_robots = AsyncMock(return_value=True)
+        enricher._fetch_page = AsyncMock(
+            return_value=(200, b'<a href="/#contact">Contact</a> hi@shop.ae', "utf-8")
+        )
+        place = MagicMock(website="https://shop.ae/", name="Shop")
+
+        data, emails = await enricher._crawl(place)
+        assert enricher._fetch_page.await_count == 1
+        assert data["contact_page_url"] == "https://shop.ae/#contact"
+        assert emails == {"hi@shop.ae": "homepage"}
+
+    async def test_shared_website_fetched_once_per_batch(self, enricher_cls):
+        enricher = enricher_cls()
+        enricher._check_robots = AsyncMock(return_value=True)
+        enricher._fetch_page = AsyncMock(return_value=(200, b"<p>chain</p>", None))
+        pages = {}
+
+        for _ in range(3):
+            await enricher._crawl(MagicMock(website="https://chain.com"), pages)
+        assert enricher._fetch_page.await_count == 1
+
+
+class TestRobotsCache:
+    async def test_robots_fetched_once_per_origin(self, enricher_cls):
+        enricher = enricher_cls()
+        resp = MagicMock(status_code=200, text="User-agent: *\nDisallow: /private")
+        client = MagicMock()
+        client.get = AsyncMock(return_value=resp)
+        enricher._get_client = AsyncMock(return_value=client)
+
+        with patch("app.services.enrichment.settings.respect_robots_txt", True):
+            results = await asyncio.gather(
+                enricher._check_robots("https://shop.com/"),
+                enricher._check_robots("https://shop.com/menu"),
+                enricher._check_robots("https://shop.com/private/x"),
+            )
+        assert results == [True, True, False]
+        assert client.get.await_count == 1
+        # The fetch lock is dropped once the origin's rules are cached
+        assert not enricher._robots_locks
+        assert "https://shop.com" in enricher._robots
+
+
+# ── Places Client Tests ──────────────────────────────────────────
+
+class TestUpsertPlaces:
+    async def test_single_lookup_and_concurrent_details(self):
+        from app.services.places_client import upsert_places
+
+        existing = SimpleNamespace(id=1, place_id="a")
+        lookup = MagicMock()
+        lookup.scalars.return_value = [existing]
+        upserted = MagicMock()
+        upserted.scalars.return_value = [
+            SimpleNamespace(id=3, place_id="c"),
+            SimpleNamespace(id=2, place_id="b"),
+        ]
+        db = AsyncMock()
+        db.execute.side_effect = [lookup, upserted]
+
+        active = {"now": 0, "peak": 0}
+
+        async def fake_details(place_id):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            if place_id == "c":
+                raise RuntimeError("boom")
+            return {"id": place_id, "displayName": {"text": "Details B"}}
+
+        client = MagicMock()
+        client.get_place_details = AsyncMock(side_effect=fake_details)
+        raw = [{"id": "a"}, {"id": "b"}, {"id": "b"}, {"id": "c", "displayName": {"text": "Raw C"}}]
+        places = await upsert_places(db, raw, "cafe", None, client)
+
+        assert db.execute.await_count == 2  # lookup + upsert, no re-fetch
+        assert db.execute.await_args_list[0].args[1] == {"place_ids": ["a", "b", "c"]}
+        assert [c.args[0] for c in client.get_place_details.await_args_list] == ["b", "c"]
+        assert active["peak"] == 2
+        assert [p.id for p in places] == [1, 2, 3]  # search result order
+
+
+class TestPlaceDetailsCache:
+    async def test_concurrent_calls_share_one_fetch_and_hits_return_data(self):
+        from app.services import places_client
+        from app.services.places_client import GooglePlacesClient
+
+        places_client._details_cache.clear()
+        calls = []
+
+        async def fake_fetch(place_id):
+            calls.append(place_id)
+            await asyncio.sleep(0.01)
+            data = {"id": place_id}
+            places_client._details_cache[place_id] = data
+            return data
+
+        client = GooglePlacesClient()
+        client._fetch_place_details = fake_fetch
+
+        first = await asyncio.gather(*(client.get_place_details("x") for _ in range(5)))
+        again = await client.get_place_details("x")
+        assert calls == ["x"]
+        assert first == [{"id": "x"}] * 5
+        assert again == {"id": "x"}
+        assert not places_client._details_inflight
+        places_client._details_cache.clear()
+
+
+class TestGridSearch:
+    async def test_cells_run_concurrently_and_dedup(self):
+        from app.services.places_client import GooglePlacesClient, GRID_SEARCH_CONCURRENCY
+
+        active = {"now": 0, "peak": 0}
+
+        async def fake_text_search(query, location=None, radius=None, max_pages=3):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return [{"id": "shared"}, {"id": location}]
+
+        progress = []
+
+        async def on_progress(current, total, unique):
+            progress.append((current, total))
+
+        client = GooglePlacesClient()
+        client.text_search = fake_text_search
+        results = await client.grid_search("cafe", 0.0, 0.0, 10.0, on_progress=on_progress)
+
+        ids = [r["id"] for r in results]
+        assert len(ids) == len(set(ids)) == 26  # 5x5 cells + the shared id
+        assert 1 < active["peak"] <= GRID_SEARCH_CONCURRENCY
+        assert progress == [(i, 25) for i in range(1, 26)]
+
+
+class TestPlacesRetryPolicy:
+    @staticmethod
+    def _status_error(status, headers=None):
+        import httpx
+
+        request = httpx.Request("GET", "https://places.googleapis.com/v1/places/x")
+        response = httpx.Response(status, headers=headers or {}, request=request)
+        return httpx.HTTPStatusError("err", request=request, response=response)
+
+    def test_only_transient_errors_are_retried(self):
+        import httpx
+        from app.services.places_client import _is_retryable
+
+        assert _is_retryable(self._status_error(429))
+        assert _is_retryable(self._status_error(503))
+        assert _is_retryable(httpx.ConnectError("down"))
+        assert not _is_retryable(self._status_error(400))
+        assert not _is_retryable(self._status_error(403))
+
+    def test_wait_honours_retry_after_and_jitters_otherwise(self):
+        from app.services.places_client import _retry_wait
+
+        state = MagicMock(attempt_number=1)
+        state.outcome.exception.return_value = self._status_error(429, {"Retry-After": "7"})
+        assert _retry_wait(state) == 7.0
+
+        state.outcome.exception.return_value = self._status_error(503)
+        waits = {_retry_wait(state) for _ in range(20)}
+        assert all(2 <= w <= 4 for w in waits)
+        assert len(waits) > 1
+
 
 # ── Scoring Engine Tests ─────────────────────────────────────────
 
 class TestScoringEngine:
-    def setup_method(self):
-        from app.services.scoring import ScoringEngine
-        self.engine = ScoringEngine()
+    # Short test-side names for the longer model fields
+    _ALIASES = {"phone": "formatted_phone_number", "address": "formatted_address"}
 
     def _make_place(self, **kwargs):
-        place = MagicMock()
-        place.id = kwargs.get("id", 1)
-        place.name = kwargs.get("name", "Test")
-        place.user_ratings_total = kwargs.get("user_ratings_total", None)
-        place.rating = kwargs.get("rating", None)
-        place.website = kwargs.get("website", None)
-        place.formatted_phone_number = kwargs.get("phone", None)
-        place.opening_hours = kwargs.get("opening_hours", None)
-        place.formatted_address = kwargs.get("address", None)
-        place.latitude = kwargs.get("latitude", None)
-        place.longitude = kwargs.get("longitude", None)
-        return place
-
-    def test_demand_score_zero_reviews(self):
+        fields = {self._ALIASES.get(k, k): v for k, v in kwargs.items()}
+        return FakePlace(**{"id": 1, "name": "Test", **fields})
+
+    def test_demand_score_zero_reviews(self, scoring_engine):
         place = self._make_place(user_ratings_total=0)
-        assert self.engine._demand_score(place) == 0.0
+        assert scoring_engine._demand_score(place) == 0.0
 
-    def test_demand_score_scales_with_reviews(self):
+    def test_demand_score_scales_with_reviews(self, scoring_engine):
         low = self._make_place(user_ratings_total=10)
         high = self._make_place(user_ratings_total=5000)
-        assert self.engine._demand_score(high) > self.engine._demand_score(low)
+        assert scoring_engine._demand_score(high) > scoring_engine._demand_score(low)
 
-    def test_demand_score_capped_at_one(self):
+    def test_demand_score_capped_at_one(self, scoring_engine):
         place = self._make_place(user_ratings_total=999999)
-        assert self.engine._demand_score(place) <= 1.0
+        assert scoring_engine._demand_score(place) <= 1.0
 
-    def test_rating_score_normalization(self):
+    def test_rating_score_normalization(self, scoring_engine):
         place_5 = self._make_place(rating=5.0)
         place_1 = self._make_place(rating=1.0)
         place_none = self._make_place(rating=None)
 
-        assert self.engine._rating_score(place_5) == 1.0
-        assert self.engine._rating_score(place_1) == 0.0
-        assert self.engine._rating_score(place_none) == 0.0
+        assert scoring_engine._rating_score(place_5) == 1.0
+        assert scoring_engine._rating_score(place_1) == 0.0
+        assert scoring_engine._rating_score(place_none) == 0.0
 
-    def test_accessibility_score_all_present(self):
+    def test_accessibility_score_all_present(self, scoring_engine):
         place = self._make_place(
             website="https://test.com",
             phone="+971501234567",
             opening_hours={"open_now": True},
             address="123 Street",
         )
-        score = self.engine._accessibility_score(place)
+        score = scoring_engine._accessibility_score(place)
         assert score == 1.0
 
-    def test_accessibility_score_none(self):
+    def test_accessibility_score_none(self, scoring_engine):
         place = self._make_place()
-        score = self.engine._accessibility_score(place)
+        score = scoring_engine._accessibility_score(place)
         assert score == 0.0
 
-    def test_weights_sum_to_one(self):
-        total = sum(self.engine.WEIGHTS.values())
-        assert abs(total - 1.0) < 0.001
+    def test_competition_score_from_counts(self, scoring_engine):
+        assert scoring_engine._competition_score(None) == 0.5
+        assert scoring_engine._competition_score(0) == 1.0
+        assert scoring_engine._competition_score(3) > scoring_engine._competition_score(30)
+
+    async def test_competition_counts_one_query_for_batch(self, scoring_engine):
+        from sqlalchemy.dialects import postgresql
+
+        places = [
+            self._make_place(id=1, latitude=25.0, longitude=55.0),
+            self._make_place(id=2, latitude=25.01, longitude=55.01),
+            self._make_place(id=3),  # no coordinates
+        ]
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(all=lambda: [(1, 4), (2, 0)])
+        counts = await scoring_engine._competition_counts(db, places)
+
+        assert counts == {1: 4, 2: 0}
+        db.execute.assert_awaited_once()
+        compiled = db.execute.await_args.args[0].compile(dialect=postgresql.asyncpg.dialect())
+        assert "= ANY" in str(compiled)
+        assert [1, 2] in compiled.params.values()
+
+    def test_score_batch_matches_scalar_scores(self, scoring_engine):
+        places = [
+            self._make_place(id=1, user_ratings_total=0, rating=None),
+            self._make_place(id=2, user_ratings_total=37, rating=4.3, website="https://a.com",
+                             phone="+1", latitude=1.0, longitude=1.0),
+            self._make_place(id=3, user_ratings_total=999999, rating=5.0, address="x",
+                             opening_hours={"open_now": True}, latitude=1.0, longitude=1.0),
+            self._make_place(id=4, user_ratings_total=120, rating=0.5, latitude=1.0, longitude=1.0),
+        ]
+        counts = {2: 0, 3: 7, 4: 150}
+        batch = scoring_engine.score_batch(places, counts)
+
+        for i, place in enumerate(places):
+            expected = {
+                "demand_score": scoring_engine._demand_score(place),
+                "competition_score": scoring_engine._competition_score(counts.get(place.id)),
+                "accessibility_score": scoring_engine._accessibility_score(place),
+                "rating_score": scoring_engine._rating_score(place),
+            }
+            for key, value in expected.items():
+                assert batch[key][i] == pytest.approx(value, abs=1e-4)
+            composite = sum(expected[k + "_score"] * w for k, w in scoring_engine.WEIGHTS.items())
+            assert batch["composite_score"][i] == pytest.approx(composite, abs=1e-4)
+
+    async def test_score_places_writes_batch_in_two_statements(self, scoring_engine, monkeypatch):
+        from sqlalchemy import inspect
+        from sqlalchemy.dialects import postgresql
+        from app.db.models import Place
+
+        places = [
+            Place(id=1, name="a", user_ratings_total=10, rating=4.0),
+            Place(id=2, name="b", website="https://b.com"),
+        ]
+        upserted = MagicMock()
+        upserted.scalars.return_value = [SimpleNamespace(place_id=2), SimpleNamespace(place_id=1)]
+        db = AsyncMock()
+        db.execute.side_effect = [upserted, MagicMock()]
+        monkeypatch.setattr(scoring_engine, "_competition_counts", AsyncMock(return_value={}))
+
+        scores = await scoring_engine.score_places(db, places)
+
+        assert [s.place_id for s in scores] == [1, 2]
+        assert db.execute.await_count == 2
+        upsert_sql = str(db.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (place_id) DO UPDATE" in upsert_sql
+        assert places[0].location_score > 0
+        assert not inspect(places[0]).attrs.location_score.history.has_changes()
+        db.commit.assert_awaited_once()
+
+    async def test_save_scores_chunks_large_batches(self, scoring_engine, monkeypatch):
+        from app.services import scoring
+
+        places = [self._make_place(id=i) for i in range(1, 6)]
+        upserts = [MagicMock() for _ in range(3)]
+        for upsert, ids in zip(upserts, ([1, 2], [3, 4], [5])):
+            upsert.scalars.return_value = [SimpleNamespace(place_id=i) for i in ids]
+        db = AsyncMock()
+        db.execute.side_effect = [upserts[0], MagicMock(), upserts[1], MagicMock(), upserts[2], MagicMock()]
+        monkeypatch.setattr(scoring, "SAVE_CHUNK_SIZE", 2)
+
+        batch = scoring_engine.score_batch(places, {})
+        scores = await scoring_engine._save_scores(db, places, batch)
+
+        assert [s.place_id for s in scores] == [1, 2, 3, 4, 5]
+        assert db.execute.await_count == 6
+
+    async def test_score_all_unscored_selects_columns_only(self, scoring_engine, monkeypatch):
+        from app.services.scoring import SCORING_COLUMNS
+
+        rows = [MagicMock(), MagicMock()]
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(all=lambda: rows)
+        monkeypatch.setattr(scoring_engine, "score_places", AsyncMock())
+
+        assert await scoring_engine.score_all_unscored(db) == 2
+        stmt = db.execute.await_args.args[0]
+        assert len(stmt.selected_columns) == len(SCORING_COLUMNS)
+        scoring_engine.score_places.assert_awaited_once_with(db, rows)
 
 
 # ── Schema Validation Tests ──────────────────────────────────────
@@ -244,6 +646,31 @@ class TestSchemas:
         with pytest.raises(Exception):
             SearchRequest(query="")
 
+    def test_heatmap_request_rejects_inverted_bbox(self):
+        from pydantic import ValidationError
+        from app.schemas import HeatmapRequest
+
+        bounds = {"lat_min": 25.0, "lat_max": 25.3, "lng_min": 55.0, "lng_max": 55.3}
+        with pytest.raises(ValidationError):
+            HeatmapRequest(category="cafe", **{**bounds, "lat_max": 24.9})
+        with pytest.raises(ValidationError):
+            HeatmapRequest(category="cafe", **{**bounds, "lng_min": 55.4})
+        # A zero-height box is valid; it just has no cells
+        HeatmapRequest(category="cafe", **{**bounds, "lat_max": 25.0})
+
+    def test_search_request_parses_center(self):
+        from app.schemas import SearchRequest
+        req = SearchRequest(query="cafes", location=" 25.2048, 55.2708 ")
+        assert req.center_lat == 25.2048
+        assert req.center_lng == 55.2708
+
+    def test_search_request_non_coordinate_location(self):
+        from app.schemas import SearchRequest
+        req = SearchRequest(query="cafes", location="Dubai Marina")
+        assert req.center_lat is None
+        assert req.center_lng is None
+        assert "center" not in req.model_dump()
+
     def test_heatmap_request_validation(self):
         from app.schemas import HeatmapRequest
         req = HeatmapRequest(
@@ -253,7 +680,91 @@ class TestSchemas:
         )
         assert req.grid_size == 0.01
 
+    def test_place_out_from_orm_trusted(self):
+        from app.schemas import PlaceOut
+        place = SimpleNamespace(**{f: None for f in PlaceOut.model_fields})
+        place.id, place.place_id, place.name = 7, "ChIJabc", "Cafe"
+        place.emails = [SimpleNamespace(email="info@cafe.ae", source="homepage")]
+        place.enrichment = None
+
+        out = PlaceOut.from_orm_trusted(place)
+        assert out.id == 7
+        assert out.emails[0].email == "info@cafe.ae"
+        assert out.model_dump()["enrichment"] is None
+
     def test_place_out_from_attributes(self):
         from app.schemas import PlaceOut
         # Should accept from_attributes config
         assert PlaceOut.model_config.get("from_attributes") is True
+
+
+# ── Enrichment Queue Tests ───────────────────────────────────────
+
+class TestEnrichmentQueue:
+    async def test_submissions_within_window_are_merged(self):
+        from app.services.enrichment_queue import EnrichmentQueue
+
+        batches = []
+
+        async def handler(place_ids):
+            batches.append(place_ids)
+
+        queue = EnrichmentQueue(handler, workers=1, batch_window=0.05)
+        queue.start()
+        queue.submit([1, 2, 3])
+        queue.submit([3, 4])
+        await asyncio.sleep(0.2)
+        await queue.stop()
+        assert batches == [[1, 2, 3, 4]]
+
+    async def test_failed_batch_does_not_stop_worker(self):
+        from app.services.enrichment_queue import EnrichmentQueue
+
+        handler = AsyncMock(side_effect=[RuntimeError("boom"), None])
+
+        queue = EnrichmentQueue(handler, workers=1, batch_window=0.01)
+        queue.start()
+        queue.submit([1])
+        await asyncio.sleep(0.05)
+        queue.submit([2])
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        assert handler.await_count == 2
+
+
+# ── Heatmap Binning Tests ────────────────────────────────────────
+
+class TestHeatmapBinning:
+    def test_scatter_cells_fills_dense_grid(self):
+        from decimal import Decimal
+        from app.services.heatmap import scatter_cells
+
+        rows = [
+            (0, 0, 2, 4.0, Decimal("2")),
+            (0, 1, 1, 5.0, Decimal("3")),
+            (2, 0, 1, 3.0, None),
+        ]
+        counts, ratings, prices = scatter_cells(rows, 3, 2)
+        assert counts.tolist() == [2, 1, 0, 0, 1, 0]
+        assert ratings[0] == 4.0 and ratings[1] == 5.0 and ratings[4] == 3.0
+        assert prices[0] == 2.0
+        assert np.isnan(prices[4]) and np.isnan(ratings[2])
+
+    def test_scatter_cells_empty(self):
+        from app.services.heatmap import scatter_cells
+
+        counts, ratings, _ = scatter_cells([], 2, 2)
+        assert counts.tolist() == [0, 0, 0, 0]
+        assert np.isnan(ratings).all()
+
+    async def test_degenerate_bbox_skips_upsert(self):
+        from app.services.heatmap import HeatmapEngine
+
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(all=lambda: [])
+        grid = await HeatmapEngine().compute_heatmap(db, "cafe", 25.0, 25.0, 55.0, 55.5)
+
+        assert len(grid) == 0
+        # Delete and GROUP BY only; no INSERT for an empty grid
+        assert db.execute.await_count == 2
+        db.commit.assert_awaited_once()